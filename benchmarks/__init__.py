@@ -0,0 +1,21 @@
+"""
+Benchmarks for the document generator.
+
+Synthetic obiekty/bron/nadzor CSVs, employee lists and a SQLite copy of the
+CDN tables make it possible to time the generator and the employee queries
+without the production CSVs and SQL Server.
+"""
+
+from .synthetic import (
+    synthetic_employees,
+    write_synthetic_cdn_database,
+    write_synthetic_csvs,
+)
+
+__all__ = [
+    "synthetic_employees",
+    "write_synthetic_cdn_database",
+    "write_synthetic_csvs",
+]
+
+__version__ = "1.0.0"
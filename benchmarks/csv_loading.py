@@ -0,0 +1,97 @@
+"""
+Compare the schema-based CSV loader with the previous full read.
+
+    python -m benchmarks.csv_loading --contracts 10000
+
+For every synthetic input file this reports the load time (best of
+--repeat), the peak memory allocated while loading (tracemalloc) and the
+memory held by the resulting DataFrame, for both loaders.
+"""
+
+import argparse
+from pathlib import Path
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Allow running as a script from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+from benchmarks.synthetic import write_synthetic_csvs
+from utils.csv_schemas import (
+    ENTITIES_SCHEMA,
+    FIREARMS_SCHEMA,
+    SUPERVISION_SCHEMA,
+    read_csv_with_schema,
+)
+
+
+def read_csv_full(file_path, schema) -> pd.DataFrame:
+    """The loader used before the schemas: every column, inferred dtypes."""
+    return pd.read_csv(file_path, encoding="utf-8")
+
+
+def parse_dates(df: pd.DataFrame, schema) -> pd.DataFrame:
+    for column in schema.dates:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], errors="coerce", format="mixed")
+    return df
+
+
+def measure(loader, file_path, schema, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse_dates(loader(file_path, schema), schema)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    df = parse_dates(loader(file_path, schema), schema)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "load_s": best,
+        "peak_mb": peak / 2**20,
+        "frame_mb": df.memory_usage(deep=True).sum() / 2**20,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--contracts", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="books-csv-") as work_dir:
+        firearms, entities, supervision = write_synthetic_csvs(
+            Path(work_dir), args.contracts, args.seed
+        )
+        files = [
+            (entities, ENTITIES_SCHEMA),
+            (firearms, FIREARMS_SCHEMA),
+            (supervision, SUPERVISION_SCHEMA),
+        ]
+
+        print(
+            f"{'file':<12} {'loader':<8} {'load ms':>9} {'peak MB':>9} {'frame MB':>9}"
+        )
+        for file_path, schema in files:
+            for name, loader in (
+                ("full", read_csv_full),
+                ("schema", read_csv_with_schema),
+            ):
+                result = measure(loader, file_path, schema, args.repeat)
+                print(
+                    f"{file_path.name:<12} {name:<8} {result['load_s'] * 1000:>9.1f} "
+                    f"{result['peak_mb']:>9.2f} {result['frame_mb']:>9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
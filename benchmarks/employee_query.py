@@ -0,0 +1,117 @@
+"""
+Time the employee query and its post-processing on a synthetic CDN database.
+
+    python -m benchmarks.employee_query --contracts 300
+    python -m benchmarks.employee_query --database cdn.sqlite3 --repeat 5
+
+The CDN tables are written to a SQLite file (kept with --database, reused
+when it already exists) and queried through the same EmployeeRepository and
+EmployeeService as on SQL Server. For a month, a quarter and the whole year
+this reports the query time (executing and fetching all rows), the time
+EmployeeFactory takes to turn the rows into employees, the full
+EmployeeService call, and the batch query of every month at once. Timings
+are the best of --repeat runs.
+"""
+
+import argparse
+from datetime import date
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+# Allow running as a script from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import write_synthetic_cdn_database
+from models import EmployeeFactory
+from repositories import EmployeeRepository, SqliteDatabase
+from services.employee_service import EmployeeService
+from utils.report_periods import batch_periods
+
+FIRST_MONTH = date(2024, 1, 1)
+
+
+def best_of(repeat: int, func):
+    """Smallest wall time of `repeat` calls to `func`, and its last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--contracts", type=int, default=300)
+    parser.add_argument("--database", type=Path, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="books-cdn-") as work_dir:
+        path = args.database or Path(work_dir) / "cdn.sqlite3"
+        if not path.exists():
+            started = time.perf_counter()
+            write_synthetic_cdn_database(path, args.contracts, seed=args.seed)
+            print(
+                f"Seeded {path} in {time.perf_counter() - started:.1f} s "
+                f"({path.stat().st_size / 2**20:.1f} MB)\n"
+            )
+
+        months = [
+            period[:2]
+            for period in batch_periods(
+                f"{FIRST_MONTH:%Y-%m}", f"{FIRST_MONTH.year}-12", "miesieczny"
+            )
+        ]
+        ranges = [
+            ("month", months[-1]),
+            ("quarter", (months[-3][0], months[-1][1])),
+            ("year", (months[0][0], months[-1][1])),
+        ]
+
+        with SqliteDatabase(path) as db:
+            repository = EmployeeRepository(db)
+            service = EmployeeService(db)
+
+            print(
+                f"{'range':<8} {'rows':>7} {'query ms':>9} "
+                f"{'factory ms':>11} {'service ms':>11}"
+            )
+            for name, (start_date, end_date) in ranges:
+                query_s, rows = best_of(
+                    args.repeat,
+                    lambda: list(
+                        repository.iter_employees_with_project_codes(
+                            start_date, end_date
+                        )
+                    ),
+                )
+                factory_s, _ = best_of(
+                    args.repeat,
+                    lambda: EmployeeFactory.create_multiple_from_db_results(rows),
+                )
+                service_s, _ = best_of(
+                    args.repeat,
+                    lambda: service.get_employees_by_period(start_date, end_date),
+                )
+                print(
+                    f"{name:<8} {len(rows):>7} {query_s * 1000:>9.1f} "
+                    f"{factory_s * 1000:>11.1f} {service_s * 1000:>11.1f}"
+                )
+
+            batch_s, by_period = best_of(
+                args.repeat, lambda: service.get_employees_by_periods(months)
+            )
+            print(
+                f"\n{len(months)} months in one query: {batch_s * 1000:.1f} ms, "
+                f"{sum(len(employees) for employees in by_period.values())} employees"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Time the document generator on synthetic data.
+
+    python -m benchmarks.run_benchmarks --scales 100 1000 --output bench.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --save-baseline
+
+For every scale (number of contracts) this measures DocumentGenerator.__init__,
+the rendering time of every contract section (create_document_content split
+into sections I-IX) and the full generate_quarterly_reports. Timings are the
+best of --repeat runs. With --baseline, metrics slower than the baseline by
+more than --tolerance are reported and the exit code is 1.
+"""
+
+import argparse
+from datetime import datetime
+import json
+import logging
+from pathlib import Path
+import platform
+import sys
+import tempfile
+import time
+
+# Allow running as a script from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx.oxml.ns import qn
+
+from benchmarks.synthetic import synthetic_employees, write_synthetic_csvs
+from document_generator import (
+    CONTRACT_SECTIONS,
+    DocumentGenerator,
+    new_report_document,
+    render_contract,
+)
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# Quarter the synthetic contracts are reported for
+START_DATE = "2024-10-01"
+END_DATE = "2024-12-31"
+
+
+def best_of(repeat: int, func):
+    """Smallest wall time of `repeat` calls to `func`, and its last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def time_sections(jobs) -> dict:
+    """Total time spent in every section over all `jobs`."""
+    totals = {name: 0.0 for name, _ in CONTRACT_SECTIONS}
+    scratch = new_report_document()
+    body = scratch.element.body
+    for job in jobs:
+        section_times = {}
+        render_contract(scratch, job, section_times)
+        for name, elapsed in section_times.items():
+            totals[name] += elapsed
+        # Detach the rendered elements so the scratch document stays small
+        for element in list(body):
+            if element.tag != qn("w:sectPr"):
+                body.remove(element)
+    return totals
+
+
+def run_scale(
+    contracts: int, employees_per_ck, seed: int, repeat: int, work_dir: Path
+) -> dict:
+    data_dir = work_dir / f"data_{contracts}"
+    output_dir = work_dir / f"output_{contracts}"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    firearms, entities, supervision = write_synthetic_csvs(data_dir, contracts, seed)
+    employees = synthetic_employees(contracts, employees_per_ck, seed)
+
+    def create_generator():
+        return DocumentGenerator(
+            firearms,
+            entities,
+            supervision,
+            None,
+            "Kw.4",
+            START_DATE,
+            END_DATE,
+            "kwartalny",
+            employees,
+        )
+
+    init_s, generator = best_of(repeat, create_generator)
+    jobs = [
+        generator.build_contract_job(START_DATE, END_DATE, department, row)
+        for department, row in generator.select_active_contracts(START_DATE, END_DATE)
+    ]
+
+    section_runs = [time_sections(jobs) for _ in range(repeat)]
+    sections_s = {
+        name: min(run[name] for run in section_runs) for name, _ in CONTRACT_SECTIONS
+    }
+
+    generate_s, _ = best_of(
+        repeat,
+        lambda: generator.generate_quarterly_reports(output_dir, START_DATE, END_DATE),
+    )
+
+    return {
+        "contracts": contracts,
+        "rendered_contracts": len(jobs),
+        "employees": len(employees),
+        "metrics": {
+            "init_s": init_s,
+            **{f"section_{name}_s": seconds for name, seconds in sections_s.items()},
+            "generate_quarterly_reports_s": generate_s,
+        },
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Metrics slower than in `baseline` by more than `tolerance`, as text."""
+    regressions = []
+    print(
+        f"\n{'scale':>7} {'metric':<32} {'baseline':>10} {'current':>10} {'ratio':>7}"
+    )
+    for scale, result in results["scales"].items():
+        base_result = baseline.get("scales", {}).get(scale)
+        if base_result is None:
+            continue
+        for metric, current in result["metrics"].items():
+            base = base_result["metrics"].get(metric)
+            if not base:
+                continue
+            ratio = current / base
+            flag = ""
+            if ratio > 1 + tolerance:
+                flag = "  << slower"
+                regressions.append(f"{scale} contracts, {metric}: {ratio:.2f}x")
+            print(
+                f"{scale:>7} {metric:<32} {base:>10.4f} {current:>10.4f} {ratio:>6.2f}x{flag}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=[100, 1000],
+        help="Numbers of contracts to benchmark (e.g. 100 1000 10000)",
+    )
+    parser.add_argument(
+        "--employees-per-ck",
+        type=int,
+        nargs=2,
+        default=[10, 100],
+        metavar=("MIN", "MAX"),
+        help="Range of synthetic employees per CK (default: 10 100)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per timing")
+    parser.add_argument("--output", default=None, help="Write results to this JSON")
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Compare with this results JSON and exit with 1 on regressions",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown against the baseline (default: 0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"Store the results as the new baseline ({BASELINE_PATH.name})",
+    )
+    args = parser.parse_args(argv)
+
+    # Per-contract INFO/WARNING logging would dominate the timings
+    logging.basicConfig(level=logging.ERROR)
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "employees_per_ck": args.employees_per_ck,
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="books-bench-") as work_dir:
+        for contracts in args.scales:
+            print(f"Benchmarking {contracts} contracts...")
+            results["scales"][str(contracts)] = run_scale(
+                contracts,
+                tuple(args.employees_per_ck),
+                args.seed,
+                args.repeat,
+                Path(work_dir),
+            )
+
+    serialized = json.dumps(results, indent=2, ensure_ascii=False)
+    print(serialized)
+    if args.output:
+        Path(args.output).write_text(serialized + "\n", encoding="utf-8")
+    if args.save_baseline:
+        BASELINE_PATH.write_text(serialized + "\n", encoding="utf-8")
+        print(f"Saved baseline to {BASELINE_PATH}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
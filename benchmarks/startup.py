@@ -0,0 +1,90 @@
+"""
+Check the startup time of program.py against a budget.
+
+    python -m benchmarks.startup --budget-ms 150
+    python -m benchmarks.startup --modules
+
+Every measurement runs a fresh interpreter: `program.py --help` (argument
+parsing, the first thing a user waits for) and `import document_generator`
+(pandas, numpy and python-docx, paid when a report is generated). Timings are
+the best of --repeat runs. The exit code is 1 when --help takes longer than
+--budget-ms. With --modules the per-module import report of
+`program.py --import-times` is printed as well.
+"""
+
+import argparse
+from pathlib import Path
+import subprocess
+import sys
+import time
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# Default time budget for `program.py --help`, in milliseconds
+DEFAULT_BUDGET_MS = 250
+
+
+def best_wall_time(command: list[str], repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(
+            command,
+            cwd=REPO_DIR,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stdin=subprocess.DEVNULL,
+        )
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modules", action="store_true")
+    args = parser.parse_args(argv)
+
+    # The interpreter alone, subtracted to show what the program adds
+    interpreter = best_wall_time([sys.executable, "-c", "pass"], args.repeat)
+    help_time = best_wall_time([sys.executable, "program.py", "--help"], args.repeat)
+    generator_time = best_wall_time(
+        [sys.executable, "-c", "import document_generator"], args.repeat
+    )
+
+    print(f"{'measurement':<28} {'wall ms':>9} {'over python':>12}")
+    for name, seconds in (
+        ("python -c pass", interpreter),
+        ("program.py --help", help_time),
+        ("import document_generator", generator_time),
+    ):
+        print(
+            f"{name:<28} {seconds * 1000:>9.1f} "
+            f"{(seconds - interpreter) * 1000:>12.1f}"
+        )
+
+    if args.modules:
+        print()
+        result = subprocess.run(
+            [sys.executable, "program.py", "--help", "--import-times"],
+            cwd=REPO_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+            stdin=subprocess.DEVNULL,
+        )
+        print(result.stdout[result.stdout.index("Module") :])
+
+    if help_time * 1000 > args.budget_ms:
+        print(
+            f"\nprogram.py --help took {help_time * 1000:.1f} ms, "
+            f"over the budget of {args.budget_ms:.0f} ms"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
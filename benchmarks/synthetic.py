@@ -0,0 +1,330 @@
+import calendar
+import csv
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import random
+import sqlite3
+from typing import List, Tuple
+
+from models.employee import Employee, EmployeeFactory
+from repositories.sqlite_backend import create_cdn_database
+
+ENTITIES_COLUMNS = [
+    "POZ KS R Umów",
+    "Oznaczenie strony lub stron umowy, z którymi przedsiębiorca zawarł umowę",
+    "Dział",
+    "CK",
+    "Określenie obiektu",
+    "Adres Obiektu",
+    "Forma wykonywanej usługi",
+    "Data rozpoczęcia usługi",
+    "Data zakończenia usługi",
+    "Uwagi",
+    "Świadczenie/ zlecanie podjazdów/ podjazdy",
+]
+SUPERVISION_COLUMNS = [
+    "Dział",
+    "Nazwisko",
+    "Imię",
+    "Nr legitymacji",
+    "Funkcja w obiekcie",
+    "rozpoczęcie",
+    "zakończenie",
+    "Uwagi",
+]
+FIREARMS_COLUMNS = [
+    "Rodzaj broni palnej",
+    "Marka broni",
+    "Kaliber",
+    "Ilość",
+    "Obiekt, do którego przydzielono pracownikom broń palną",
+    "Daty dotyczące przydziału broni palnej",
+    "Uwagi",
+]
+
+FIRST_NAMES = ["Jan", "Anna", "Piotr", "Katarzyna", "Tomasz", "Agnieszka", "Marek"]
+LAST_NAMES = ["Nowak", "Kowalski", "Wiśniewska", "Wójcik", "Kamiński", "Lewandowska"]
+MON_CKS = ["MONO_ZI", "MONO_OP", "MONO_AS"]
+
+# Contracts start between these dates, about half of them are still open
+FIRST_START = date(2022, 1, 1)
+START_SPAN_DAYS = 1100
+
+# Payslip elements of the synthetic CDN database; the ones matching the
+# SODIR/ZFRON/PZU/KOMORNICZE/ZASI filter don't count as pay
+PAYSLIP_ELEMENTS = [
+    ("Wynagrodzenie zasadnicze", 8),
+    ("Premia uznaniowa", 3),
+    ("Dodatek za pracę w porze nocnej", 3),
+    ("Ubezpieczenie grupowe PZU", 2),
+    ("Składka ZFRON", 1),
+    ("Potrącenie SODiR", 1),
+    ("Zajęcie komornicze", 1),
+    ("Zasiłek chorobowy", 1),
+]
+
+
+def contract_cks(contracts: int) -> List[str]:
+    """CK values used by `contracts` synthetic contracts, about 20 contracts per CK."""
+    ofs_cks = max(2, contracts // 20)
+    return MON_CKS + [f"OFSO_{i}" for i in range(ofs_cks)]
+
+
+def write_synthetic_csvs(
+    directory: Path, contracts: int, seed: int = 0
+) -> Tuple[Path, Path, Path]:
+    """
+    Write obiekty.csv, bron.csv and nadzor.csv with `contracts` contracts to
+    `directory`, the same for the same seed.
+
+    Returns:
+        Paths of the (firearms, entities, supervision) files
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    cks = contract_cks(contracts)
+    ofs_cks = [ck for ck in cks if ck not in MON_CKS]
+
+    entities_path = directory / "obiekty.csv"
+    with open(entities_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ENTITIES_COLUMNS)
+        for contract_no in range(1, contracts + 1):
+            department = rng.choices(["MON", "OFS", "UPC"], weights=[3, 6, 1])[0]
+            ck = rng.choice(MON_CKS if department == "MON" else ofs_cks)
+            for object_no in range(rng.choice([1, 1, 1, 2, 3])):
+                start = FIRST_START + timedelta(days=rng.randrange(START_SPAN_DAYS))
+                end = ""
+                if rng.random() < 0.5:
+                    end = str(start + timedelta(days=rng.randint(30, 700)))
+                writer.writerow(
+                    [
+                        contract_no,
+                        f"Klient {contract_no} Sp. z o.o.",
+                        department,
+                        ck,
+                        rng.choice(["Magazyn", "Biurowiec", f"Sklep nr {object_no}"]),
+                        f"ul. Testowa {contract_no}/{object_no}, Warszawa",
+                        rng.choice(["Monitoring", "Ochrona fizyczna", "Konwój"]),
+                        str(start),
+                        end,
+                        rng.choice(["", "", "aneks"]),
+                        rng.choices(["", "P", "Z"], weights=[8, 1, 1])[0],
+                    ]
+                )
+
+    supervision_path = directory / "nadzor.csv"
+    with open(supervision_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SUPERVISION_COLUMNS)
+        for i in range(max(6, contracts // 100)):
+            start = date(2020, 1, 1) + timedelta(days=rng.randrange(1800))
+            end = ""
+            if rng.random() < 0.5:
+                end = str(start + timedelta(days=rng.randint(60, 900)))
+            writer.writerow(
+                [
+                    rng.choice(["MON", "OFS"]),
+                    rng.choice(LAST_NAMES),
+                    rng.choice(FIRST_NAMES),
+                    f'"{rng.randrange(10**6):06d}"',
+                    rng.choice(["Kierownik", "Koordynator", "Dowódca zmiany"]),
+                    str(start),
+                    end,
+                    "",
+                ]
+            )
+
+    firearms_path = directory / "bron.csv"
+    with open(firearms_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIREARMS_COLUMNS)
+        writer.writerow(["Pistolet", "Glock", "9mm", 4, "OFS", "2022-03-01", ""])
+        writer.writerow(["Pistolet", "Walther", "9mm", 6, "MON", "2023-05-10", ""])
+        writer.writerow(["Strzelba", "Mossberg", "12", 1, "MON", "", "w depozycie"])
+
+    return firearms_path, entities_path, supervision_path
+
+
+def synthetic_employees(
+    contracts: int,
+    employees_per_ck: Tuple[int, int] = (10, 100),
+    seed: int = 0,
+) -> List[Employee]:
+    """
+    Employees for the CKs of `contracts` synthetic contracts, between
+    `employees_per_ck` (inclusive) per CK, built the same way as the ones
+    returned by the employee service.
+    """
+    rng = random.Random(seed)
+    employees = []
+    for ck in contract_cks(contracts):
+        for _ in range(rng.randint(*employees_per_ck)):
+            employee_id = len(employees) + 1
+            released = rng.random() < 0.1
+            employees.append(
+                EmployeeFactory.create_from_db_result(
+                    (
+                        employee_id,
+                        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                        f"P{employee_id:05d}",
+                        f"P_{ck}",
+                        datetime(2024, 1, 1) + timedelta(days=rng.randrange(730)),
+                        1 if released else 0,
+                    )
+                )
+            )
+    return employees
+
+
+def write_synthetic_cdn_database(
+    path: Path,
+    contracts: int,
+    employees_per_ck: Tuple[int, int] = (10, 100),
+    first_month: date = date(2024, 1, 1),
+    months: int = 12,
+    seed: int = 0,
+) -> Path:
+    """
+    Write a SQLite copy of the CDN tables read by the employee repository
+    (see repositories.sqlite_backend) for the CKs of `contracts` synthetic
+    contracts, the same for the same seed. Every employee has a payslip and
+    a day plan for every month of `months` starting at `first_month` while
+    employed, with most work days planned on the project of their CK.
+
+    Returns:
+        Path of the database, to be opened with SqliteDatabase
+    """
+    rng = random.Random(seed)
+    path = Path(path)
+    if path.exists():
+        path.unlink()
+    create_cdn_database(path)
+
+    month_starts = []
+    year, month = first_month.year, first_month.month
+    for _ in range(months):
+        month_starts.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    last_day = month_starts[-1].replace(
+        day=calendar.monthrange(month_starts[-1].year, month_starts[-1].month)[1]
+    )
+    element_names = [name for name, _ in PAYSLIP_ELEMENTS]
+    element_weights = [weight for _, weight in PAYSLIP_ELEMENTS]
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        cks = contract_cks(contracts)
+        conn.executemany(
+            "INSERT INTO DefProjekty VALUES (?, ?, ?)",
+            [(prj_id, f"P_{ck}", f"Projekt {ck}") for prj_id, ck in enumerate(cks, 1)],
+        )
+
+        employee_id = pre_id = wpl_id = wpe_id = ppl_id = pgl_id = 0
+        for main_project, _ in enumerate(cks, 1):
+            for _ in range(rng.randint(*employees_per_ck)):
+                employee_id += 1
+                hired = first_month - timedelta(days=rng.randrange(1500))
+                if rng.random() < 0.5:
+                    hired = first_month + timedelta(days=rng.randrange(60))
+                released = None
+                if rng.random() < 0.1:
+                    released = hired + timedelta(days=rng.randint(30, 400))
+                    released = max(released, first_month + timedelta(days=15))
+                employed_until = min(released or last_day, last_day)
+                first_name = rng.choice(FIRST_NAMES)
+                last_name = rng.choice(LAST_NAMES)
+
+                etaty = []
+                if rng.random() < 0.25:
+                    # An earlier, closed employment record of the same person
+                    pre_id += 1
+                    etaty.append(
+                        (
+                            pre_id,
+                            employee_id,
+                            f"P{employee_id:05d}",
+                            first_name,
+                            last_name,
+                            str(hired - timedelta(days=900)),
+                            str(hired - timedelta(days=1)),
+                            str(hired - timedelta(days=1)),
+                        )
+                    )
+                pre_id += 1
+                etaty.append(
+                    (
+                        pre_id,
+                        employee_id,
+                        f"P{employee_id:05d}",
+                        f" {first_name}",
+                        f"{last_name} ",
+                        str(hired),
+                        "2999-12-31",
+                        str(released) if released else None,
+                    )
+                )
+                conn.executemany(
+                    "INSERT INTO PracEtaty VALUES (?, ?, ?, ?, ?, ?, ?, ?)", etaty
+                )
+
+                contract_type = "U" if rng.random() < 0.3 else "L"
+                payslips, elements, plan_days, plan_hours = [], [], [], []
+                for month_start in month_starts:
+                    if month_start > employed_until or hired > month_start.replace(
+                        day=28
+                    ):
+                        continue
+                    month_end = month_start.replace(
+                        day=calendar.monthrange(month_start.year, month_start.month)[1]
+                    )
+                    wpl_id += 1
+                    payslips.append(
+                        (
+                            wpl_id,
+                            employee_id,
+                            f"{contract_type}/{wpl_id}/{month_start:%m/%Y}",
+                            str(month_start),
+                            str(month_end),
+                        )
+                    )
+                    for name in rng.choices(
+                        element_names, element_weights, k=rng.randint(1, 4)
+                    ):
+                        wpe_id += 1
+                        elements.append(
+                            (wpe_id, wpl_id, name, round(rng.uniform(50, 6000), 2))
+                        )
+
+                    day = max(month_start, hired)
+                    while day <= min(month_end, employed_until):
+                        ppl_id += 1
+                        work_day = day.weekday() < 5
+                        plan_days.append(
+                            (ppl_id, employee_id, str(day), 1 if work_day else 2)
+                        )
+                        if work_day:
+                            project = main_project
+                            if rng.random() < 0.05:
+                                project = rng.randint(1, len(cks))
+                            pgl_id += 1
+                            plan_hours.append((pgl_id, ppl_id, project))
+                        day += timedelta(days=1)
+
+                conn.executemany("INSERT INTO Wyplaty VALUES (?, ?, ?, ?, ?)", payslips)
+                conn.executemany(
+                    "INSERT INTO WypElementy VALUES (?, ?, ?, ?)", elements
+                )
+                conn.executemany(
+                    "INSERT INTO PracPlanDni VALUES (?, ?, ?, ?)", plan_days
+                )
+                conn.executemany(
+                    "INSERT INTO PracPlanDniGodz VALUES (?, ?, ?)", plan_hours
+                )
+        conn.commit()
+    finally:
+        conn.close()
+    return path
@@ -1,31 +1,102 @@
-import pyodbc
 import configparser
-from typing import Optional, Any, List, Tuple
+from contextlib import contextmanager
+from functools import lru_cache
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Any, Iterator, List, Tuple
+
+# pyodbc is imported by the methods that use it, so importing this module
+# (e.g. for --help) doesn't load the ODBC driver manager
+if TYPE_CHECKING:
+    import pyodbc
+
+logger = logging.getLogger(__name__)
+
+# A connection used within this many seconds is trusted without a "SELECT 1"
+# probe ([database] idle_probe_seconds)
+DEFAULT_IDLE_PROBE_SECONDS = 60.0
+# Attempts to reopen a lost connection ([database] reconnect_attempts), the
+# delay before the second one doubles for every further attempt up to the max.
+# 8 attempts wait about 22 s in total, enough to ride out a VPN reconnect.
+DEFAULT_RECONNECT_ATTEMPTS = 8
+RECONNECT_DELAY_SECONDS = 0.5
+MAX_RECONNECT_DELAY_SECONDS = 5.0
+# Rows fetched per round trip when reading results ([database] fetch_arraysize)
+DEFAULT_FETCH_ARRAYSIZE = 1000
+# Connections a ConnectionPool keeps open at most ([database] pool_size)
+DEFAULT_POOL_SIZE = 4
+
+# Preferred SQL Server ODBC drivers, newest first
+SQL_SERVER_DRIVERS = ["ODBC Driver 18 for SQL Server", "ODBC Driver 17 for SQL Server"]
+
+
+@lru_cache(maxsize=None)
+def sql_server_driver() -> str:
+    """The installed SQL Server ODBC driver, looked up once per process."""
+    import pyodbc
+
+    drivers = pyodbc.drivers()
+    print("Available drivers:", drivers)
+    for driver in SQL_SERVER_DRIVERS:
+        if driver in drivers:
+            return driver
+    raise Exception("No suitable SQL Server driver found")
+
+
+def _fetch_rows(cursor, arraysize: int):
+    """Yield the rows of the executed statement, fetching `arraysize` at a time"""
+    cursor.arraysize = arraysize
+    while True:
+        rows = cursor.fetchmany()
+        if not rows:
+            return
+        yield from rows
+
+
+def _is_connection_error(error) -> bool:
+    """True for driver errors meaning the connection is gone (SQLSTATE 08xxx)."""
+    return bool(error.args) and str(error.args[0]).startswith("08")
 
 
 class DatabaseConnection:
     def __init__(self, config: configparser.ConfigParser):
-        self.conn: Optional[pyodbc.Connection] = None
-        self.cursor: Optional[pyodbc.Cursor] = None
+        self.conn: Optional["pyodbc.Connection"] = None
+        self.cursor: Optional["pyodbc.Cursor"] = None
         self.config = config
-
-    def connect(self) -> bool:
-        try:
-            drivers = pyodbc.drivers()
-            print("Available drivers:", drivers)
-
-            if "ODBC Driver 18 for SQL Server" in drivers:
-                driver = "ODBC Driver 18 for SQL Server"
-            elif "ODBC Driver 17 for SQL Server" in drivers:
-                driver = "ODBC Driver 17 for SQL Server"
-            else:
-                raise Exception("No suitable SQL Server driver found")
+        self.idle_probe_seconds = config.getfloat(
+            "database", "idle_probe_seconds", fallback=DEFAULT_IDLE_PROBE_SECONDS
+        )
+        self.reconnect_attempts = config.getint(
+            "database", "reconnect_attempts", fallback=DEFAULT_RECONNECT_ATTEMPTS
+        )
+        self.fetch_arraysize = config.getint(
+            "database", "fetch_arraysize", fallback=DEFAULT_FETCH_ARRAYSIZE
+        )
+        self._last_used = 0.0
+        self._conn_str: Optional[str] = None
+        # Set by the first successful connect; a connection lost after that
+        # is reopened instead of failing for good
+        self._was_connected = False
+
+        # Statements sent to the server (probes included), "SELECT 1" probes
+        # sent and probes skipped because the connection was used recently
+        self.round_trips = 0
+        self.probes = 0
+        self.probes_skipped = 0
+        self.reconnects = 0
+
+    def _connection_string(self) -> str:
+        """Built on the first connect and reused when reconnecting"""
+        if self._conn_str is None:
+            driver = sql_server_driver()
 
             server = self.config.get("database", "host")
             if self.config.get("database", "port"):
                 server = f"{server},{self.config.get("database", "port")}"
 
-            conn_str = (
+            self._conn_str = (
                 f"Driver={driver};"
                 f"Server={server};"
                 f"Database={self.config.get("database", "database")};"
@@ -35,6 +106,13 @@ class DatabaseConnection:
                 "Connection Timeout=30;"
                 "Login Timeout=30;"
             )
+        return self._conn_str
+
+    def connect(self) -> bool:
+        import pyodbc
+
+        try:
+            conn_str = self._connection_string()
 
             print("Attempting to connect with connection string:")
             safe_conn_str = conn_str.replace(
@@ -44,6 +122,8 @@ class DatabaseConnection:
 
             self.conn = pyodbc.connect(conn_str)
             self.cursor = self.conn.cursor()
+            self._last_used = time.monotonic()
+            self._was_connected = True
             print("Successfully connected to the database!")
             return True
 
@@ -61,33 +141,125 @@ class DatabaseConnection:
             return False
 
     def _ensure_connection(self) -> None:
-        """Ensure we have a valid connection and cursor"""
+        """
+        Ensure we have a valid connection and cursor. Only a connection idle
+        for longer than `idle_probe_seconds` is probed with "SELECT 1" (and
+        reopened when the probe fails); a connection lost in the meantime
+        shows up as a driver error, which `_execute` handles. A connection
+        that was open before and given up by `_reconnect` is reopened again.
+        """
         if self.cursor is None or self.conn is None:
-            raise Exception("No database connection. Call connect() first.")
+            if not self._was_connected:
+                raise Exception("No database connection. Call connect() first.")
+            self._reconnect()
+            return
+
+        if self._recently_used():
+            self.probes_skipped += 1
+        elif not self._probe():
+            self._reconnect()
+
+    def _recently_used(self) -> bool:
+        return time.monotonic() - self._last_used < self.idle_probe_seconds
+
+    def _probe(self) -> bool:
+        """Send "SELECT 1", True when the server answered"""
+        import pyodbc
 
-        # Optional: Test if connection is still alive
+        self.probes += 1
+        self.round_trips += 1
         try:
-            self.cursor.execute("SELECT 1")
-            self.cursor.fetchone()
+            # On a cursor of its own, so the statement last prepared on
+            # `self.cursor` stays prepared
+            probe = self.conn.execute("SELECT 1")
+            probe.fetchone()
+            probe.close()
         except pyodbc.Error:
-            raise Exception("Database connection lost. Please reconnect.")
+            return False
+        self._last_used = time.monotonic()
+        return True
+
+    def _discard(self) -> None:
+        """Drop a (possibly dead) connection without raising"""
+        for handle in (self.cursor, self.conn):
+            try:
+                if handle is not None:
+                    handle.close()
+            except Exception:
+                pass
+        self.cursor = None
+        self.conn = None
+
+    def _reconnect(self) -> None:
+        """Reopen a lost connection, waiting longer after every failed attempt"""
+        delay = RECONNECT_DELAY_SECONDS
+        for attempt in range(1, self.reconnect_attempts + 1):
+            print(
+                "Database connection lost, reconnecting "
+                f"(attempt {attempt}/{self.reconnect_attempts})"
+            )
+            self._discard()
+            if self.connect():
+                self.reconnects += 1
+                return
+            if attempt < self.reconnect_attempts:
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+        raise Exception("Database connection lost. Please reconnect.")
+
+    def _execute(self, query: str, params: Optional[Tuple] = None):
+        """
+        Execute a statement and return the cursor. When the connection turns
+        out to be lost, it is reopened and the statement is sent once more.
+        """
+        import pyodbc
+
+        self._ensure_connection()
+
+        for retry in (False, True):
+            if self.cursor is None:  # Type guard for mypy
+                raise Exception("Cursor is None")
+            try:
+                self.round_trips += 1
+                if params:
+                    self.cursor.execute(query, params)
+                else:
+                    self.cursor.execute(query)
+                self._last_used = time.monotonic()
+                return self.cursor
+            except pyodbc.Error as e:
+                if retry or not _is_connection_error(e):
+                    raise
+                self._reconnect()
 
     def execute_query(
         self, query: str, params: Optional[Tuple] = None
-    ) -> List[pyodbc.Row]:
+    ) -> List["pyodbc.Row"]:
         print(query)
         """Execute a SELECT query and return all results"""
-        self._ensure_connection()
+        import pyodbc
 
-        if self.cursor is None:  # Type guard for mypy
-            raise Exception("Cursor is None")
+        try:
+            cursor = self._execute(query, params)
+            return cursor.fetchall()
+        except pyodbc.Error as e:
+            print(f"Error executing query: {str(e)}")
+            raise
+
+    def iter_query(
+        self, query: str, params: Optional[Tuple] = None, arraysize: int = 0
+    ) -> Iterator["pyodbc.Row"]:
+        """
+        Execute a SELECT query and yield its rows, fetched `arraysize` (default
+        `fetch_arraysize`) at a time instead of all at once. The query runs when
+        iteration starts; finish iterating before sending another statement on
+        this connection.
+        """
+        import pyodbc
 
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            return self.cursor.fetchall()
+            cursor = self._execute(query, params)
+            yield from _fetch_rows(cursor, arraysize or self.fetch_arraysize)
         except pyodbc.Error as e:
             print(f"Error executing query: {str(e)}")
             raise
@@ -96,26 +268,20 @@ class DatabaseConnection:
         self, query: str, params: Optional[Tuple] = None
     ) -> List[dict]:
         """Execute a SELECT query and return results as list of dictionaries"""
-        self._ensure_connection()
-
-        if self.cursor is None:  # Type guard for mypy
-            raise Exception("Cursor is None")
+        import pyodbc
 
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
+            cursor = self._execute(query, params)
 
             # Get column names
             columns = (
-                [column[0] for column in self.cursor.description]
-                if self.cursor.description
+                [column[0] for column in cursor.description]
+                if cursor.description
                 else []
             )
 
             # Convert rows to dictionaries
-            rows = self.cursor.fetchall()
+            rows = _fetch_rows(cursor, self.fetch_arraysize)
             return [dict(zip(columns, row)) for row in rows]
         except pyodbc.Error as e:
             print(f"Error executing query: {str(e)}")
@@ -125,18 +291,12 @@ class DatabaseConnection:
         self, query: str, params: Optional[Tuple] = None
     ) -> List[Tuple[Any, ...]]:
         """Execute a SELECT query and return results as list of tuples (if you need tuple type)"""
-        self._ensure_connection()
-
-        if self.cursor is None:  # Type guard for mypy
-            raise Exception("Cursor is None")
+        import pyodbc
 
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
+            cursor = self._execute(query, params)
 
-            rows = self.cursor.fetchall()
+            rows = _fetch_rows(cursor, self.fetch_arraysize)
             # Convert Row objects to tuples
             return [tuple(row) for row in rows]
         except pyodbc.Error as e:
@@ -145,17 +305,11 @@ class DatabaseConnection:
 
     def execute_scalar(self, query: str, params: Optional[Tuple] = None) -> Any:
         """Execute a query and return a single value"""
-        self._ensure_connection()
-
-        if self.cursor is None:  # Type guard for mypy
-            raise Exception("Cursor is None")
+        import pyodbc
 
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            result = self.cursor.fetchone()
+            cursor = self._execute(query, params)
+            result = cursor.fetchone()
             return result[0] if result else None
         except pyodbc.Error as e:
             print(f"Error executing scalar query: {str(e)}")
@@ -163,22 +317,16 @@ class DatabaseConnection:
 
     def execute_non_query(self, query: str, params: Optional[Tuple] = None) -> int:
         """Execute INSERT/UPDATE/DELETE and return rows affected"""
-        self._ensure_connection()
-
-        if self.cursor is None:  # Type guard for mypy
-            raise Exception("Cursor is None")
+        import pyodbc
 
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
+            cursor = self._execute(query, params)
 
             if self.conn is None:  # Type guard for mypy
                 raise Exception("Connection is None")
 
             self.conn.commit()
-            return self.cursor.rowcount
+            return cursor.rowcount
         except pyodbc.Error as e:
             if self.conn:
                 self.conn.rollback()
@@ -221,19 +369,18 @@ class DatabaseConnection:
             raise
 
     def is_connected(self) -> bool:
-        """Check if we have a valid connection"""
+        """Check if we have a valid connection, probing it only when idle"""
         if self.cursor is None or self.conn is None:
             return False
 
-        try:
-            self.cursor.execute("SELECT 1")
-            self.cursor.fetchone()
+        if self._recently_used():
+            self.probes_skipped += 1
             return True
-        except pyodbc.Error:
-            return False
+        return self._probe()
 
     def close(self) -> None:
         """Close the database connection"""
+        self._was_connected = False
         if self.cursor:
             self.cursor.close()
             self.cursor = None
@@ -241,6 +388,11 @@ class DatabaseConnection:
             self.conn.close()
             self.conn = None
             print("Database connection closed.")
+            print(
+                f"Database round trips: {self.round_trips} "
+                f"({self.probes} liveness probes, {self.probes_skipped} saved, "
+                f"{self.reconnects} reconnects)"
+            )
 
     def __enter__(self):
         """Context manager entry"""
@@ -251,3 +403,110 @@ class DatabaseConnection:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit"""
         self.close()
+
+
+class ConnectionPool:
+    """
+    Database connections kept open between queries.
+
+    A borrowed connection is given back open instead of closed, so the next
+    query skips the login handshake and runs on a cursor that still has the
+    last statement prepared; `warm_up` opens them before the first query.
+    pyodbc connections (and their cursors) must not be used by two threads at
+    once, so a thread borrows a whole connection with `connection()` and has
+    it to itself until the block ends. At most `size` connections exist;
+    more borrowers wait for one to be given back.
+    """
+
+    def __init__(self, config: configparser.ConfigParser, size: Optional[int] = None):
+        self.config = config
+        self.size = size or config.getint(
+            "database", "pool_size", fallback=DEFAULT_POOL_SIZE
+        )
+        self._slots = threading.BoundedSemaphore(self.size)
+        # Most recently returned first, it is the least likely to have timed out
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._connections: List[DatabaseConnection] = []
+
+    def _open(self) -> DatabaseConnection:
+        db = DatabaseConnection(self.config)
+        if not db.connect():
+            raise Exception("Failed to connect to database")
+        with self._lock:
+            self._connections.append(db)
+        return db
+
+    def _drop(self, db: DatabaseConnection) -> None:
+        """Close a connection and forget it"""
+        with self._lock:
+            if db in self._connections:
+                self._connections.remove(db)
+        try:
+            db.close()
+        except Exception as e:
+            logger.warning(f"Could not close a pooled connection: {e}")
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the calling thread. A connection that is lost
+        (given up by its reconnect, or failed with a connection error) is
+        dropped instead of given back, and the next borrower gets a new one.
+        """
+        with self._slots:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                db = None
+            if db is not None and db.conn is None:
+                self._drop(db)
+                db = None
+            if db is None:
+                db = self._open()
+
+            lost = False
+            try:
+                yield db
+            except Exception as e:
+                lost = _is_connection_error(e)
+                raise
+            finally:
+                if lost or db.conn is None:
+                    self._drop(db)
+                else:
+                    self._idle.put(db)
+
+    def warm_up(self, count: Optional[int] = None) -> int:
+        """Open up to `count` connections in parallel, return how many opened"""
+        count = min(count or self.size, self.size)
+        with self._lock:
+            missing = count - len(self._connections)
+        opened = []
+
+        def open_one():
+            try:
+                opened.append(self._open())
+            except Exception as e:
+                logger.warning(f"Could not open a pooled connection: {e}")
+
+        threads = [threading.Thread(target=open_one) for _ in range(missing)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for db in opened:
+            self._idle.put(db)
+        return len(opened)
+
+    def close(self) -> None:
+        """Close every connection of the pool"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for db in connections:
+            db.close()
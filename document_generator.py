@@ -1,21 +1,766 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, as_completed, wait
+from contextlib import nullcontext
+import copy
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+import hashlib
+from io import BytesIO
+import itertools
 import os
 from pathlib import Path
-from typing import List
+import time
+from typing import Any, List, NamedTuple
 
+import numpy as np
 import pandas as pd
 from docx import Document
 from docx.shared import Inches, Pt
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import nsdecls, qn
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from lxml import etree
 
 from models.employee import Employee
-from utils.utils import get_unique_file_path
+from utils.csv_cache import CsvCache, file_fingerprint
+from utils.csv_schemas import (
+    ENTITIES_SCHEMA,
+    FIREARMS_SCHEMA,
+    SUPERVISION_SCHEMA,
+    CsvSchema,
+    read_csv_with_schema,
+)
+from utils.docx_tables import add_table
+from utils.docx_writer import StreamingDocxWriter, atomic_save
+from utils.fragment_cache import FragmentCache
+from utils.periods import GroupedIntervalIndex, active_in_period, active_in_periods
+from utils.profiling import SectionProfiler
+from utils.utils import reserve_unique_file_path, safe_file_name_part
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Departments rendered in the report, in the order they appear in the book
+DEPARTMENTS = ["MON", "OFS"]
+# Departments whose books list the firearms assigned to them (Section VIII)
+FIREARMS_DEPARTMENTS = ["MON"]
+
+# Part of every fragment cache key, bump it whenever the rendered XML changes
+FRAGMENT_CACHE_VERSION = "1"
+
+
+def _cell_text(value) -> str:
+    return str(value) if pd.notna(value) else ""
+
+
+def _date_text(value) -> str:
+    return value.strftime("%Y-%m-%d") if pd.notna(value) else ""
+
+
+def add_page_numbers(doc):
+    """Dodaje numer strony w formacie '1 | Strona' z linią nad stopką."""
+    section = doc.sections[0]
+    footer = section.footer
+    paragraph = footer.paragraphs[0] if footer.paragraphs else footer.add_paragraph()
+
+    paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+
+    p_pr = paragraph._element.get_or_add_pPr()
+    p_borders = OxmlElement("w:pBdr")
+    top = OxmlElement("w:top")
+    top.set(qn("w:val"), "single")
+    top.set(qn("w:sz"), "6")  # grubość linii
+    top.set(qn("w:space"), "1")  # odstęp
+    top.set(qn("w:color"), "auto")
+    p_borders.append(top)
+    p_pr.append(p_borders)
+
+    run = paragraph.add_run()
+    run.font.bold = True
+    run.font.size = Pt(10)
+
+    fldChar1 = OxmlElement("w:fldChar")  # begin field
+    fldChar1.set(qn("w:fldCharType"), "begin")
+
+    instrText = OxmlElement("w:instrText")  # polecenie
+    instrText.text = "PAGE"  # type: ignore
+
+    fldChar2 = OxmlElement("w:fldChar")  # separate field
+    fldChar2.set(qn("w:fldCharType"), "separate")
+
+    fldChar3 = OxmlElement("w:fldChar")  # end field
+    fldChar3.set(qn("w:fldCharType"), "end")
+
+    run._r.append(fldChar1)
+    run._r.append(instrText)
+    run._r.append(fldChar2)
+    run._r.append(fldChar3)
+
+    separator_run = paragraph.add_run(" | ")
+    separator_run.bold = True
+    separator_run.font.size = Pt(10)
+
+    text_run = paragraph.add_run("Strona")
+    text_run.bold = False
+    text_run.font.size = Pt(10)
+
+
+@lru_cache(maxsize=1)
+def _report_skeleton():
+    """
+    Empty report document with margins and the page-number footer already
+    set, built once per process and only ever cloned.
+    """
+    doc = Document()
+
+    # Set document margins
+    for section in doc.sections:
+        section.left_margin = Inches(0.5)
+        section.right_margin = Inches(0.5)
+        section.top_margin = Inches(0.5)
+        section.bottom_margin = Inches(1)
+
+    add_page_numbers(doc)
+    return doc
+
+
+def new_report_document():
+    """
+    Return an empty report document cloned from the cached skeleton.
+
+    Deep-copying the already parsed package is cheaper than `Document()`,
+    which unzips and parses the default template every time.
+    """
+    return copy.deepcopy(_report_skeleton())
+
+
+@lru_cache(maxsize=1)
+def report_skeleton_bytes() -> bytes:
+    """The cached skeleton saved as a .docx, for writers that copy its parts."""
+    buffer = BytesIO()
+    _report_skeleton().save(buffer)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=1)
+def table_style_id() -> str:
+    """Style id of "Table Grid" in documents created by new_report_document."""
+    return _report_skeleton().styles["Table Grid"].style_id
+
+
+@dataclass
+class ContractJob:
+    """
+    Everything needed to render the book of one contract. Plain data, so it can
+    be sent to a worker process.
+    """
+
+    department: str
+    start_date: str
+    end_date: str
+    period_start: pd.Timestamp
+    current_row: pd.Series
+    object_rows: pd.DataFrame
+    employees: List[Employee]
+    supervisors: pd.DataFrame
+    # Section VIII row, None when no firearms are assigned
+    firearms: List[str] | None = None
+
+
+def _render_header(doc, job: ContractJob):
+    """Sections I-IV: contract number and party, period and volume."""
+    current_row = job.current_row
+    poz_ks = int(float(current_row["POZ KS R Umów"]))
+    start_date = job.start_date
+    end_date = job.end_date
+
+    # I. Księga Realizacji
+    para = doc.add_paragraph()
+    para.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    run = para.add_run("I.  ")
+    run.bold = True
+    run.font.size = Pt(14)
+
+    run = para.add_run(f"KSIĘGA REALIZACJI UMOWY Nr {poz_ks}")
+    run.bold = True
+    run.font.size = Pt(14)
+
+    # Add contract party name
+    para = doc.add_paragraph()
+    para.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    para.space_before = Pt(2)
+    run = para.add_run(
+        f"    Zawartej z {current_row['Oznaczenie strony lub stron umowy, z którymi przedsiębiorca zawarł umowę']}"
+    )
+    run.bold = True
+    run.font.size = Pt(12)
+    para.space_after = Pt(12)
+
+    # II. Start date
+    para = doc.add_paragraph()
+    run = para.add_run(f"II. OD: {start_date}")
+    run.bold = True
+
+    # III. End date
+    para = doc.add_paragraph()
+    run = para.add_run(f"III. DO: {end_date}")
+    run.bold = True
+
+    # IV. Volume (Dział-CK)
+    para = doc.add_paragraph()
+    run = para.add_run(f"IV. VOL. Nr. {current_row['Dział']}-{current_row['CK']}")
+    run.bold = True
+
+
+def _render_locations(doc, job: ContractJob):
+    """Section V: the contract's objects and forms of service."""
+    poz_ks = int(float(job.current_row["POZ KS R Umów"]))
+    style_id = table_style_id()
+
+    # V. Location and form
+    para = doc.add_paragraph()
+    run = para.add_run("V. Miejsce wykonywania usługi oraz forma jej wykonywania")
+    run.bold = True
+
+    add_table(
+        doc,
+        [
+            "L.p.",
+            "Księga",
+            "Określenie obiektu",
+            "Adres Obiektu",
+            "Forma Wykonywanej Usługi",
+            "Data rozpoczęcia",
+            "Data zakończenia",
+            "Uwagi",
+        ],
+        [5, 8, 22, 22, 18, 9, 9, 7],
+        [
+            [
+                f"{row_data['L.p.']}.",
+                str(poz_ks),
+                _cell_text(row_data["Określenie obiektu"]),
+                _cell_text(row_data["Adres Obiektu"]),
+                _cell_text(row_data["Forma wykonywanej usługi"]),
+                _date_text(row_data["Data rozpoczęcia usługi"]),
+                _date_text(row_data["Data zakończenia usługi"]),
+                _cell_text(row_data["Uwagi"]),
+            ]
+            for _, row_data in job.object_rows.iterrows()
+        ],
+        style_id,
+    )
+
+
+def _render_employees(doc, job: ContractJob):
+    """Section VI: employees of the contract's CK."""
+    current_row = job.current_row
+    start_date = job.start_date
+    end_date = job.end_date
+    style_id = table_style_id()
+
+    # VI. PRACOWNICY OCHRONY WYKONUJĄCY USŁUGĘ
+    doc.add_paragraph()
+    para = doc.add_paragraph()
+    run = para.add_run("VI. PRACOWNICY OCHRONY WYKONUJĄCY USŁUGĘ")
+    run.bold = True
+
+    current_ck = str(current_row["CK"]).strip()
+
+    filtered_employees = job.employees
+
+    if len(filtered_employees) == 0:
+        contract_name = current_row[
+            "Oznaczenie strony lub stron umowy, z którymi przedsiębiorca zawarł umowę"
+        ]
+        logger.warning(
+            f"\nWARNING: No employees found for contract: {contract_name} (CK: {current_ck}, {start_date} - {end_date})"
+        )
+
+    logger.info(
+        f"\nProcessing contract: {current_row['Oznaczenie strony lub stron umowy, z którymi przedsiębiorca zawarł umowę']}"
+    )
+    logger.info(f"CK value: {current_ck}")
+    logger.info(f"Date range: {start_date} to {end_date}")
+    logger.info(f"Found {len(filtered_employees)} matching employees")
+    if not len(filtered_employees) > 0:
+        logger.info("First few matching employees:")
+        logger.info(filtered_employees[:3])
+
+    employee_rows = [
+        [
+            f"{idx + 1}.",
+            str(emp.last_name),
+            str(emp.first_name),
+            str(emp.kod),
+            str(emp.position),
+            str(start_date),
+            str(emp.release_date),
+            "",
+        ]
+        for idx, emp in enumerate(filtered_employees)
+    ]
+    # Two empty rows at the end for appearance
+    employee_rows.extend([[""] * 8 for _ in range(2)])
+
+    add_table(
+        doc,
+        [
+            "L.p.",
+            "Nazwisko",
+            "Imię",
+            "Numer Legitymacji",
+            "Funkcja w obiekcie",
+            "Data rozpoczęcia",
+            "Data zakończenia",
+            "Uwagi",
+        ],
+        [5, 15, 15, 12, 23, 12, 12, 6],
+        employee_rows,
+        style_id,
+    )
+
+
+def _render_supervisors(doc, job: ContractJob):
+    """Section VII: supervisors of the department active in the period."""
+    period_start = job.period_start
+    style_id = table_style_id()
+
+    # VII. PRACOWNICY OCHRONY SPRAWUJĄCY NADZÓR
+    doc.add_paragraph()
+    para = doc.add_paragraph()
+    run = para.add_run(
+        "VII. PRACOWNICY OCHRONY SPRAWUJĄCY NADZÓR NAD PRACOWNIKAMI OCHRONY WYKONUJĄCYMI USŁUGĘ"
+    )
+    run.bold = True
+
+    filtered_data = job.supervisors
+
+    supervision_rows = []
+    for idx, (_, row_s) in enumerate(filtered_data.iterrows()):
+        start_date_s = ""
+        if pd.notna(row_s["rozpoczęcie"]):
+            # Use the later of the quarter start or the actual start date
+            start_date_s = max(row_s["rozpoczęcie"], period_start).strftime("%Y-%m-%d")
+
+        # If no end date, use empty string because it didn't end
+        end_date_s = _date_text(row_s["zakończenie"])
+
+        supervision_rows.append(
+            [
+                f"{idx + 1}.",
+                str(row_s["Nazwisko"]),
+                str(row_s["Imię"]),
+                str(row_s["Nr legitymacji"]).strip('"'),
+                str(row_s["Funkcja w obiekcie"]),
+                start_date_s,
+                end_date_s,
+                _cell_text(row_s["Uwagi"]),
+            ]
+        )
+    # At least two rows below the header, empty ones for appearance
+    supervision_rows.extend([[""] * 8 for _ in range(2 - len(supervision_rows))])
+
+    add_table(
+        doc,
+        [
+            "L.p.",
+            "Nazwisko",
+            "Imię",
+            "Numer Legitymacji",
+            "Funkcja w obiekcie",
+            "Daty rozpoczęcie",
+            "Daty zakończenie",
+            "Uwagi",
+        ],
+        [5, 15, 15, 12, 23, 12, 12, 6],
+        supervision_rows,
+        style_id,
+    )
+
+
+def _render_firearms(doc, job: ContractJob):
+    """Section VIII: firearms assigned to the department."""
+    style_id = table_style_id()
+
+    # VIII. ILOŚĆ I RODZAJ BRONI PALNEJ
+    doc.add_paragraph()
+    para = doc.add_paragraph()
+    run = para.add_run(
+        "VIII. ILOŚĆ I RODZAJ BRONI PALNEJ PRZYDZIELONEJ PRACOWNIKOM OCHRONY DO WYKONANIA USŁUGI"
+    )
+    run.bold = True
+
+    data_cells_firearms = job.firearms
+    if data_cells_firearms is None:
+        data_cells_firearms = ["1", "Nie przyznano", "", "", "", "", "", "", ""]
+
+    add_table(
+        doc,
+        [
+            "L.p.",
+            "Rodzaj broni palnej",
+            "Marka broni",
+            "Kaliber",
+            "Ilość",
+            "Obiekt, do którego przydzielono pracownikom broń palną",
+            "Przydział broni palnej",
+            "Cofnięcie przydziału broni palnej",
+            "Uwagi",
+        ],
+        [5, 12, 10, 8, 8, 27, 12, 12, 6],
+        [data_cells_firearms],
+        style_id,
+    )
+
+
+def _render_coercion(doc, job: ContractJob):
+    """Section IX: direct coercion measures (never assigned)."""
+    style_id = table_style_id()
+
+    # IX. ILOŚĆ I RODZAJ ŚRODKÓW PRZYMUSU BEZPOŚREDNIEGO
+    doc.add_paragraph()
+    para = doc.add_paragraph()
+    run = para.add_run(
+        "IX. ILOŚĆ I RODZAJ ŚRODKÓW PRZYMUSU BEZPOŚREDNIEGO PRZYDZIELONYCH PRACOWNIKOM OCHRONY DO WYKONANIA USŁUGI"
+    )
+    run.bold = True
+
+    add_table(
+        doc,
+        [
+            "L.p.",
+            "Rodzaj środka przymusu bezpośredniego",
+            "Ilość",
+            "Obiekt do którego przydzielono pracownikom ś.p.b.",
+            "Daty przydziału",
+            "Uwagi",
+        ],
+        [5, 35, 10, 25, 15, 10],
+        [["1", "Nie przyznano", "", "", "", ""]],
+        style_id,
+    )
+
+
+# Put before the key in the file names of generate_split_reports
+SPLIT_FILE_MARKERS = {"contract": "umowa", "department": "dzial"}
+
+
+# Sections of a contract's book in rendering order, as (name, function)
+CONTRACT_SECTIONS = [
+    ("I-IV", _render_header),
+    ("V", _render_locations),
+    ("VI", _render_employees),
+    ("VII", _render_supervisors),
+    ("VIII", _render_firearms),
+    ("IX", _render_coercion),
+]
+
+
+def render_contract(doc, job: ContractJob, section_times: dict | None = None):
+    """
+    Append the book of a single contract (sections I-IX) to the end of `doc`.
+    When `section_times` is given, the time spent in every section is stored
+    in it under the section's name.
+    """
+    try:
+        if section_times is None:
+            for _, render_section in CONTRACT_SECTIONS:
+                render_section(doc, job)
+        else:
+            for name, render_section in CONTRACT_SECTIONS:
+                started = time.perf_counter()
+                render_section(doc, job)
+                section_times[name] = time.perf_counter() - started
+    except Exception as e:
+        print(
+            f"Error creating document content for POZ KS R Umów {job.current_row['POZ KS R Umów']}: {e}"
+        )
+        raise
+
+
+class RenderedContract(NamedTuple):
+    """One rendered contract, as body elements or as their serialized XML."""
+
+    content: Any
+    paragraph_count: int
+    # False when rendering failed part way, such output is never cached
+    complete: bool = True
+    # Seconds per section, when profiling
+    section_times: dict | None = None
+
+
+def render_contract_elements(doc, job: ContractJob) -> list:
+    """
+    Render `job` into the empty scratch document `doc` and detach the rendered
+    body elements from it, leaving `doc` empty for the next contract.
+
+    Errors are reported the same way as in the report loop and whatever was
+    rendered before the error is kept.
+    """
+    return _render_detached(doc, job).content
+
+
+def _render_detached(doc, job: ContractJob, profile: bool = False) -> RenderedContract:
+    complete = True
+    section_times = {} if profile else None
+    try:
+        render_contract(doc, job, section_times)
+    except Exception as e:
+        complete = False
+        print(
+            f"Error processing document for {job.department} - POZ KS R Umów {job.current_row['POZ KS R Umów']}: {e}"
+        )
+
+    body = doc.element.body
+    elements = [element for element in body if element.tag != qn("w:sectPr")]
+    for element in elements:
+        body.remove(element)
+    return RenderedContract(
+        elements, _paragraph_count(elements), complete, section_times
+    )
+
+
+# Serialized `_page_break_paragraph`, for the streaming writer
+PAGE_BREAK_XML = b'<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+def _page_break_paragraph():
+    """The paragraph `Document.add_page_break` appends, as a detached element."""
+    return parse_xml(f'<w:p {nsdecls("w")}><w:r><w:br w:type="page"/></w:r></w:p>')
+
+
+# Scratch document of a worker process, reused for every contract it renders
+_worker_document = None
+
+
+def _render_contract_worker(
+    job: ContractJob, profile: bool = False
+) -> RenderedContract:
+    """Process pool entry point: render one contract as serialized XML."""
+    global _worker_document
+    if _worker_document is None:
+        _worker_document = new_report_document()
+    rendered = _render_detached(_worker_document, job, profile)
+    return rendered._replace(content=_serialize_elements(rendered.content))
+
+
+def _serialize_elements(elements) -> bytes:
+    return b"".join(etree.tostring(element) for element in elements)
+
+
+def _paragraph_count(elements) -> int:
+    return sum(1 for element in elements if element.tag == qn("w:p"))
+
+
+def _parse_contract_elements(fragment: bytes) -> list:
+    wrapper = parse_xml(f"<w:body {nsdecls('w')}>".encode() + fragment + b"</w:body>")
+    return list(wrapper)
+
+
+def _render_contracts(
+    jobs: List[ContractJob], as_xml: bool = False, profile: bool = False
+):
+    """Render `jobs` one by one in this process, like a one-worker `_render_jobs`."""
+    scratch = new_report_document()
+    for job in jobs:
+        rendered = _render_detached(scratch, job, profile)
+        if as_xml:
+            rendered = rendered._replace(content=_serialize_elements(rendered.content))
+        yield rendered
+
+
+def contract_fingerprint(job: ContractJob) -> str:
+    """
+    Hash of everything the rendered contract depends on: its object rows,
+    employees, supervisors, firearms and the period. Two jobs with the same
+    fingerprint render to the same XML.
+    """
+    digest = hashlib.sha256()
+
+    def add(text: str):
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+
+    add(FRAGMENT_CACHE_VERSION)
+    add(f"{job.department}|{job.start_date}|{job.end_date}|{job.period_start}")
+    add(job.current_row.to_json(date_format="iso", default_handler=str))
+    for df in (job.object_rows, job.supervisors):
+        add(df.to_json(orient="split", date_format="iso", default_handler=str))
+    if job.firearms is not None:
+        add(repr(job.firearms))
+    for emp in job.employees:
+        add(repr((emp.name, emp.kod, emp.position, emp.release_date)))
+    return digest.hexdigest()
+
+
+def _cached_contracts(
+    jobs: List[ContractJob], cache: FragmentCache, render, as_xml: bool = False
+):
+    """
+    Rendered contracts for `jobs`, in job order, reusing the cached XML of
+    contracts whose fingerprint did not change. `render(jobs)` must yield the
+    others as serialized XML, in order.
+    """
+    keys = [contract_fingerprint(job) for job in jobs]
+    cached = [cache.contains(key) for key in keys]
+    fresh = render([job for job, hit in zip(jobs, cached) if not hit])
+
+    reused = 0
+    for job, key, hit in zip(jobs, keys, cached):
+        entry = cache.get(key) if hit else None
+        if entry is not None:
+            paragraph_count, _, fragment = entry.partition(b"\n")
+            rendered = RenderedContract(fragment, int(paragraph_count))
+            reused += 1
+        else:
+            # Evicted by another run since the lookup, render it here
+            if hit:
+                rendered = next(_render_contracts([job], as_xml=True))
+            else:
+                rendered = next(fresh)
+            if rendered.complete:
+                cache.put(key, b"%d\n" % rendered.paragraph_count + rendered.content)
+
+        if not as_xml:
+            rendered = rendered._replace(
+                content=_parse_contract_elements(rendered.content)
+            )
+        yield rendered
+
+    logger.info(
+        f"Fragment cache: {reused} contract(s) reused, {len(jobs) - reused} rendered"
+    )
+    cache.trim()
+
+
+def _phases(profiler: SectionProfiler | None):
+    """`profiler.phase`, or a timer that does nothing when not profiling."""
+    if profiler is None:
+        return lambda name: nullcontext()
+    return profiler.phase
+
+
+def _iter_book_parts(rendered, as_xml: bool = False, phase=_phases(None)):
+    """
+    Contract bodies from `rendered` (RenderedContract) in book order, separated
+    by page breaks.
+    """
+    paragraph_count = 0
+    for contract in rendered:
+        # Add page break only if there's existing content
+        if paragraph_count > 1:
+            with phase("page breaks"):
+                page_break = PAGE_BREAK_XML if as_xml else [_page_break_paragraph()]
+            yield page_break
+            paragraph_count += 1
+
+        yield contract.content
+        paragraph_count += contract.paragraph_count
+
+
+def write_report(
+    rendered,
+    file_path: Path,
+    stream: bool = False,
+    profiler: SectionProfiler | None = None,
+):
+    """
+    Assemble rendered contracts into one report and save it to `file_path`.
+    `rendered` must hold serialized XML when `stream` is set and element lists
+    otherwise. With a `profiler`, the time spent rendering, inserting page
+    breaks, assembling and saving is added to it.
+    """
+    phase = _phases(profiler)
+    if profiler is not None:
+        rendered = profiler.timed("render", rendered)
+
+    if stream:
+        writer = StreamingDocxWriter(report_skeleton_bytes(), file_path)
+        writer.open()
+        try:
+            for fragment in _iter_book_parts(rendered, True, phase):
+                with phase("assemble"):
+                    writer.write(fragment)
+            with phase("save"):
+                writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        return
+
+    # Margins and page numbers come with the cached skeleton
+    doc = new_report_document()
+
+    # Looked up once: python-docx finds sectPr by scanning the whole body
+    sect_pr = doc.element.body.sectPr
+    for elements in _iter_book_parts(rendered, False, phase):
+        with phase("assemble"):
+            for element in elements:
+                sect_pr.addprevious(element)
+
+    with phase("save"):
+        atomic_save(doc, file_path)
+
+
+def _outcome(future) -> tuple:
+    """(error, result) of a finished future, one of them None."""
+    error = future.exception()
+    return (error, None) if error is not None else (None, future.result())
+
+
+def _contract_key(job: ContractJob) -> str:
+    """The contract number ("POZ KS R Umów") of a job, usable in file names."""
+    contract_no = job.current_row["POZ KS R Umów"]
+    try:
+        return str(int(float(contract_no)))
+    except (TypeError, ValueError):
+        return safe_file_name_part(contract_no)
+
+
+def _record_contracts(profiler: SectionProfiler, jobs: List[ContractJob], rendered):
+    """Yield from `rendered`, adding the section times of every contract."""
+    for job, contract in zip(jobs, rendered):
+        if contract.section_times:
+            profiler.add_contract(
+                f"{job.department} POZ {_contract_key(job)}",
+                contract.section_times,
+                {
+                    "objects": len(job.object_rows),
+                    "employees": len(job.employees),
+                    "supervisors": len(job.supervisors),
+                },
+            )
+        yield contract
+
+
+def _write_report_worker(
+    jobs: List[ContractJob],
+    file_path: Path,
+    stream: bool = False,
+    fragment_cache: FragmentCache | None = None,
+    profile: bool = False,
+) -> SectionProfiler | None:
+    """
+    Process pool entry point: render `jobs` and save them as one report.
+    With `profile`, returns a SectionProfiler holding the timings of the run.
+    """
+    profiler = SectionProfiler() if profile else None
+    if fragment_cache is None:
+        rendered = _render_contracts(jobs, as_xml=stream, profile=profile)
+    else:
+        rendered = _cached_contracts(
+            jobs,
+            fragment_cache,
+            lambda misses: _render_contracts(misses, as_xml=True, profile=profile),
+            as_xml=stream,
+        )
+    if profiler is not None:
+        rendered = _record_contracts(profiler, jobs, rendered)
+    write_report(rendered, file_path, stream, profiler)
+    return profiler
+
 
 class DocumentGenerator:
     """Main class for generating kwartalny security service reports."""
@@ -31,12 +776,112 @@ class DocumentGenerator:
         end_date="",
         interval="",
         employees: List[Employee] = [],
+        fragment_cache: FragmentCache | None = None,
+        profiler: SectionProfiler | None = None,
+        csv_cache: CsvCache | None = None,
     ):
         if start_date == "" or end_date == "" or interval == "" or employees == []:
             raise Exception(
                 "Brakuje którejś ze ściezek do plików źródłowych lub wynikowych"
             )
 
+        self._load_inputs(
+            firearms_file_name,
+            entities_file_name,
+            supervision_file_name,
+            fragment_cache,
+            profiler,
+            csv_cache,
+        )
+        self._set_period(month, quarter, start_date, end_date, interval, employees)
+
+    @classmethod
+    def preload(
+        cls,
+        firearms_file_name: Path,
+        entities_file_name: Path,
+        supervision_file_name: Path,
+        fragment_cache: FragmentCache | None = None,
+        profiler: SectionProfiler | None = None,
+        csv_cache: CsvCache | None = None,
+    ) -> "DocumentGenerator":
+        """
+        Load the CSVs and build the indexes before the period is known, e.g.
+        while the user still picks the dates. Use `for_period` on the result to
+        get a generator for a period; `generate_batch_reports` works directly.
+        """
+        generator = cls.__new__(cls)
+        generator._load_inputs(
+            firearms_file_name,
+            entities_file_name,
+            supervision_file_name,
+            fragment_cache,
+            profiler,
+            csv_cache,
+        )
+        return generator
+
+    def _load_inputs(
+        self,
+        firearms_file_name: Path,
+        entities_file_name: Path,
+        supervision_file_name: Path,
+        fragment_cache: FragmentCache | None,
+        profiler: SectionProfiler | None,
+        csv_cache: CsvCache | None,
+    ):
+        """Read the CSVs and build everything that doesn't depend on the period."""
+        self.fragment_cache = fragment_cache
+        self.profiler = profiler
+        self.csv_cache = csv_cache
+        load_started = time.perf_counter()
+
+        # Every date column is parsed once, invalid dates go into one warning
+        date_problems = []
+        self.final_df = self._load_input(
+            entities_file_name, ENTITIES_SCHEMA, date_problems
+        )
+        self.firearms_df = self._load_input(
+            firearms_file_name, FIREARMS_SCHEMA, date_problems
+        )
+        self.supervision_data = self._load_input(
+            supervision_file_name, SUPERVISION_SCHEMA, date_problems
+        )
+        if date_problems:
+            logger.warning(
+                "Invalid dates were treated as empty:\n" + "\n".join(date_problems)
+            )
+        if "Daty dotyczące przydziału broni palnej" in self.firearms_df.columns:
+            self.firearms_df["przydział"] = self.firearms_df[
+                "Daty dotyczące przydziału broni palnej"
+            ]
+
+        # Contract dates for the "active in period" selection
+        self.contract_starts = self._date_array("Data rozpoczęcia usługi")
+        self.contract_ends = self._date_array("Data zakończenia usługi")
+
+        self.contract_index = self._build_contract_index()
+        self.firearms_index = self._build_firearms_index()
+        self.supervision_index = GroupedIntervalIndex(
+            self.supervision_data, "Dział", "rozpoczęcie", "zakończenie"
+        )
+        if profiler is not None:
+            profiler.add("load", time.perf_counter() - load_started)
+
+    def _set_period(
+        self,
+        month: str | None,
+        quarter: str | None,
+        start_date: str,
+        end_date: str,
+        interval: str,
+        employees: List[Employee],
+        active_contracts: np.ndarray | None = None,
+    ):
+        """
+        Set up everything that depends on the run's period. `active_contracts`
+        is the period's row of `active_contract_matrix`, when already known.
+        """
         self.start_date = start_date
         self.end_date = end_date
         self.interval = interval
@@ -47,29 +892,205 @@ class DocumentGenerator:
         else:
             self.quarter = quarter
             self.month = None
-        self.final_df = self._load_csv(entities_file_name)
-        self.firearms_df = self._load_csv(firearms_file_name)
-        self.supervision_data = self._load_csv(supervision_file_name)
+        self.period_start = pd.Timestamp(self.start_date)
+        self.period_end = pd.Timestamp(self.end_date)
+        self._period_active_contracts = active_contracts
 
-        # Convert date columns in firearms_df
-        if "Daty dotyczące przydziału broni palnej" in self.firearms_df.columns:
-            self.firearms_df["przydział"] = pd.to_datetime(
-                self.firearms_df["Daty dotyczące przydziału broni palnej"],
-                errors="coerce",
-            )
+        self.employees_by_ck = self._build_employee_index()
+        self._firearms_cells = self._firearms_cells_for_period(self.period_start)
 
-        # Convert dates in supervision_data
-        self.supervision_data["rozpoczęcie"] = pd.to_datetime(
-            self.supervision_data["rozpoczęcie"], errors="coerce"
+        # Supervisors active in the run's period, per department
+        self._active_supervisors = {}
+        for department in self.supervision_index.keys():
+            self.get_active_supervisors(department, self.start_date, self.end_date)
+
+    def for_period(
+        self,
+        month: str | None,
+        quarter: str | None,
+        start_date: str,
+        end_date: str,
+        interval: str,
+        employees: List[Employee],
+        active_contracts: np.ndarray | None = None,
+    ) -> "DocumentGenerator":
+        """
+        Return a generator for another period that shares this one's loaded
+        CSVs and indexes, so a batch of periods reads the files only once.
+        """
+        if employees == []:
+            raise Exception(f"Brak pracowników w okresie {start_date} - {end_date}")
+        generator = copy.copy(self)
+        generator._set_period(
+            month, quarter, start_date, end_date, interval, employees, active_contracts
         )
-        self.supervision_data["zakończenie"] = pd.to_datetime(
-            self.supervision_data["zakończenie"], errors="coerce"
+        return generator
+
+    def _load_input(self, file_path, schema: CsvSchema, date_problems: List[str]):
+        """
+        Load an input CSV with its date columns parsed, from the CSV cache when
+        the file did not change since it was cached. Descriptions of invalid
+        dates are appended to `date_problems`.
+        """
+        fingerprint = None
+        if self.csv_cache is not None:
+            try:
+                fingerprint = file_fingerprint(file_path)
+            except OSError:
+                pass  # _load_csv reports the missing file
+            else:
+                cached = self.csv_cache.get(fingerprint, schema)
+                if cached is not None:
+                    df, problems = cached
+                    date_problems.extend(problems)
+                    return df
+
+        df = self._load_csv(file_path, schema)
+        problems = self._parse_dates(Path(file_path).name, df, schema.dates)
+        date_problems.extend(problems)
+        if fingerprint is not None and not df.empty:
+            self.csv_cache.put(fingerprint, schema, df, problems)
+        return df
+
+    def _parse_dates(self, file_name: str, df: pd.DataFrame, columns) -> List[str]:
+        """
+        Convert the date columns of a loaded CSV to datetime64 in place.
+
+        Values that cannot be parsed become NaT and are described in the
+        returned list, by file and column, so they can be reported in a
+        single warning instead of failing later while rendering a contract.
+        """
+        problems = []
+        for column in columns:
+            if column not in df.columns:
+                continue
+
+            raw = df[column]
+            parsed = pd.to_datetime(raw, errors="coerce", format="mixed")
+            invalid = raw.notna() & (raw.astype(str).str.strip() != "") & parsed.isna()
+            if invalid.any():
+                examples = ", ".join(repr(v) for v in raw[invalid].unique()[:3])
+                lines = ", ".join(str(i + 2) for i in raw.index[invalid][:10])
+                problems.append(
+                    f"  {file_name} / {column}: {int(invalid.sum())} value(s), "
+                    f"e.g. {examples} (CSV lines: {lines})"
+                )
+            df[column] = parsed
+        return problems
+
+    def _period_timestamps(self, start_date: str, end_date: str):
+        if start_date == self.start_date and end_date == self.end_date:
+            return self.period_start, self.period_end
+        return pd.Timestamp(start_date), pd.Timestamp(end_date)
+
+    def _date_array(self, column):
+        if column not in self.final_df.columns:
+            return np.full(len(self.final_df), np.datetime64("NaT"), "datetime64[ns]")
+        return self.final_df[column].to_numpy(dtype="datetime64[ns]")
+
+    def _build_contract_index(self):
+        """
+        Group object rows by "POZ KS R Umów" once, so that rendering a contract
+        does not scan the whole object table again.
+
+        Every group keeps the original file order, has a fresh 0..n-1 index
+        and a "L.p." column with the Section V row numbers. The rows of a
+        contract are numbered 1..n even when they are not next to each other
+        in the file; numbering them by their distance from the first row, as
+        the per-contract scan did, ran past the end of the table.
+        """
+        if "POZ KS R Umów" not in self.final_df.columns:
+            return {}
+
+        contract_index = {}
+        for contract_no, rows in self.final_df.groupby("POZ KS R Umów", sort=False):
+            rows = rows.reset_index(drop=True)
+            rows["L.p."] = range(1, len(rows) + 1)
+            contract_index[contract_no] = rows
+        return contract_index
+
+    def _build_employee_index(self):
+        """
+        Group employees by their CK once, keeping the order returned by the
+        employee service within every group.
+        """
+        employees_by_ck: dict[str | None, List[Employee]] = {}
+        for employee in self.employees:
+            employees_by_ck.setdefault(employee.ck, []).append(employee)
+        return employees_by_ck
+
+    def get_active_supervisors(self, department, start_date, end_date):
+        """Supervision rows of a department active between start_date and end_date."""
+        key = (department, start_date, end_date)
+        if key not in self._active_supervisors:
+            active = self.supervision_index.active_rows(
+                department, *self._period_timestamps(start_date, end_date)
+            )
+            if active is None:
+                active = self.supervision_data.iloc[0:0]
+            self._active_supervisors[key] = active
+        return self._active_supervisors[key]
+
+    def _renderable_contracts(self) -> np.ndarray:
+        df = self.final_df
+        return (
+            df["POZ KS R Umów"].notna()
+            & (df["POZ KS R Umów"].astype(str) != "")
+            & (df["Świadczenie/ zlecanie podjazdów/ podjazdy"].astype(str) != "P")
+        ).to_numpy()
+
+    def active_contract_matrix(self, periods) -> np.ndarray:
+        """
+        (periods x object rows) boolean matrix of the rows `select_active_contracts`
+        would pick for every (start_date, end_date) pair in `periods`, computed
+        in one vectorized step.
+        """
+        period_starts = [pd.Timestamp(start) for start, _ in periods]
+        period_ends = [pd.Timestamp(end) for _, end in periods]
+        return self._renderable_contracts()[np.newaxis, :] & active_in_periods(
+            self.contract_starts, self.contract_ends, period_starts, period_ends
         )
 
-    def _load_csv(self, file_path):
-        """Helper to load CSV and handle errors."""
+    def select_active_contracts(self, start_date: str, end_date: str):
+        """
+        Return the object rows to render for the period as (department, row)
+        pairs, grouped by department in DEPARTMENTS order and in file order
+        within a department.
+
+        A row is rendered when it has a contract number, is not a "P" (podjazdy)
+        row and its service started by the end of the period and did not end
+        before the period started.
+        """
+        df = self.final_df
+        if (
+            self._period_active_contracts is not None
+            and start_date == self.start_date
+            and end_date == self.end_date
+        ):
+            selected = self._period_active_contracts
+        else:
+            selected = self._renderable_contracts() & active_in_period(
+                self.contract_starts,
+                self.contract_ends,
+                *self._period_timestamps(start_date, end_date),
+            )
+
+        contracts = []
+        for dept in DEPARTMENTS:
+            dept_rows = df[selected & (df["Dział"] == dept).to_numpy()]
+            contracts.extend((dept, row) for _, row in dept_rows.iterrows())
+        return contracts
+
+    def _load_csv(self, file_path, schema: CsvSchema | None = None):
+        """
+        Helper to load CSV and handle errors. With a `schema` only its columns
+        are read, with compact dtypes.
+        """
         try:
-            df = pd.read_csv(file_path, encoding="utf-8")
+            if schema is None:
+                df = pd.read_csv(file_path, encoding="utf-8")
+            else:
+                df = read_csv_with_schema(file_path, schema)
             logger.info(f"Successfully loaded {file_path}")
             return df
         except FileNotFoundError:
@@ -81,52 +1102,7 @@ class DocumentGenerator:
 
     def add_page_numbers(self, doc):
         """Dodaje numer strony w formacie '1 | Strona' z linią nad stopką."""
-        section = doc.sections[0]
-        footer = section.footer
-        paragraph = (
-            footer.paragraphs[0] if footer.paragraphs else footer.add_paragraph()
-        )
-
-        paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
-
-        p_pr = paragraph._element.get_or_add_pPr()
-        p_borders = OxmlElement("w:pBdr")
-        top = OxmlElement("w:top")
-        top.set(qn("w:val"), "single")
-        top.set(qn("w:sz"), "6")  # grubość linii
-        top.set(qn("w:space"), "1")  # odstęp
-        top.set(qn("w:color"), "auto")
-        p_borders.append(top)
-        p_pr.append(p_borders)
-
-        run = paragraph.add_run()
-        run.font.bold = True
-        run.font.size = Pt(10)
-
-        fldChar1 = OxmlElement("w:fldChar")  # begin field
-        fldChar1.set(qn("w:fldCharType"), "begin")
-
-        instrText = OxmlElement("w:instrText")  # polecenie
-        instrText.text = "PAGE"  # type: ignore
-
-        fldChar2 = OxmlElement("w:fldChar")  # separate field
-        fldChar2.set(qn("w:fldCharType"), "separate")
-
-        fldChar3 = OxmlElement("w:fldChar")  # end field
-        fldChar3.set(qn("w:fldCharType"), "end")
-
-        run._r.append(fldChar1)
-        run._r.append(instrText)
-        run._r.append(fldChar2)
-        run._r.append(fldChar3)
-
-        separator_run = paragraph.add_run(" | ")
-        separator_run.bold = True
-        separator_run.font.size = Pt(10)
-
-        text_run = paragraph.add_run("Strona")
-        text_run.bold = False
-        text_run.font.size = Pt(10)
+        add_page_numbers(doc)
 
     # def get_quarter_dates(self, year, quarter):
     #     """Calculate start and end dates for a given quarter."""
@@ -143,499 +1119,367 @@ class DocumentGenerator:
 
     #     return quarter_start, quarter_end
 
-    def create_document_content(
-        self, doc, start_date: str, end_date: str, department, current_row
-    ):
-        try:
-            year = datetime.strptime(self.end_date, "%Y-%m-%d").year
-            # quarter_start, quarter_end = self.get_quarter_dates(year, quarter)
-            poz_ks = int(float(current_row["POZ KS R Umów"]))
-
-            # Filter matching rows for Section V (Locations and Form)
-            matching_rows = self.final_df[
-                self.final_df["POZ KS R Umów"] == current_row["POZ KS R Umów"]
-            ].copy()
-
-            # I. Księga Realizacji
-            para = doc.add_paragraph()
-            para.alignment = WD_ALIGN_PARAGRAPH.LEFT
-            run = para.add_run("I.  ")
-            run.bold = True
-            run.font.size = Pt(14)
-
-            run = para.add_run(f"KSIĘGA REALIZACJI UMOWY Nr {poz_ks}")
-            run.bold = True
-            run.font.size = Pt(14)
-
-            # Add contract party name
-            para = doc.add_paragraph()
-            para.alignment = WD_ALIGN_PARAGRAPH.LEFT
-            para.space_before = Pt(2)
-            run = para.add_run(
-                f"    Zawartej z {current_row['Oznaczenie strony lub stron umowy, z którymi przedsiębiorca zawarł umowę']}"
-            )
-            run.bold = True
-            run.font.size = Pt(12)
-            para.space_after = Pt(12)
-
-            # II. Start date
-            para = doc.add_paragraph()
-            run = para.add_run(f"II. OD: {start_date}")
-            run.bold = True
-
-            # III. End date
-            para = doc.add_paragraph()
-            run = para.add_run(f"III. DO: {end_date}")
-            run.bold = True
-
-            # IV. Volume (Dział-CK)
-            para = doc.add_paragraph()
-            run = para.add_run(
-                f"IV. VOL. Nr. {current_row['Dział']}-{current_row['CK']}"
-            )
-            run.bold = True
-
-            # V. Location and form
-            para = doc.add_paragraph()
-            run = para.add_run(
-                "V. Miejsce wykonywania usługi oraz forma jej wykonywania"
-            )
-            run.bold = True
-
-            table = doc.add_table(rows=len(matching_rows) + 1, cols=8)
-            table.style = "Table Grid"
-            col_widths = [5, 8, 22, 22, 18, 9, 9, 7]
-
-            for row_obj in table.rows:
-                for idx, cell in enumerate(row_obj.cells):
-                    cell.width = Inches(col_widths[idx] / 100 * 7.5)
-
-            headers = [
-                "L.p.",
-                "Księga",
-                "Określenie obiektu",
-                "Adres Obiektu",
-                "Forma Wykonywanej Usługi",
-                "Data rozpoczęcia",
-                "Data zakończenia",
-                "Uwagi",
-            ]
-            for i, header in enumerate(headers):
-                cell = table.cell(0, i)
-                cell.text = header
-                cell.paragraphs[0].runs[0].bold = True
-
-            for idx, row_data in matching_rows.iterrows():
-                row_num = idx - matching_rows.index[0] + 1
-                data_row = table.rows[row_num]
-
-                data_row.cells[0].text = f"{row_num}."
-                data_row.cells[1].text = str(poz_ks)
-                data_row.cells[2].text = (
-                    str(row_data["Określenie obiektu"])
-                    if pd.notna(row_data["Określenie obiektu"])
-                    else ""
-                )
-                data_row.cells[3].text = (
-                    str(row_data["Adres Obiektu"])
-                    if pd.notna(row_data["Adres Obiektu"])
-                    else ""
-                )
-                data_row.cells[4].text = (
-                    str(row_data["Forma wykonywanej usługi"])
-                    if pd.notna(row_data["Forma wykonywanej usługi"])
-                    else ""
-                )
-                data_row.cells[5].text = (
-                    pd.to_datetime(row_data["Data rozpoczęcia usługi"]).strftime(
-                        "%Y-%m-%d"
-                    )
-                    if pd.notna(row_data["Data rozpoczęcia usługi"])
-                    else ""
-                )
-                data_row.cells[6].text = (
-                    pd.to_datetime(row_data["Data zakończenia usługi"]).strftime(
-                        "%Y-%m-%d"
-                    )
-                    if pd.notna(row_data["Data zakończenia usługi"])
-                    else ""
-                )
-                data_row.cells[7].text = (
-                    str(row_data["Uwagi"]) if pd.notna(row_data["Uwagi"]) else ""
-                )
-
-            # VI. PRACOWNICY OCHRONY WYKONUJĄCY USŁUGĘ
-            doc.add_paragraph()
-            para = doc.add_paragraph()
-            run = para.add_run("VI. PRACOWNICY OCHRONY WYKONUJĄCY USŁUGĘ")
-            run.bold = True
-
-            current_ck = str(current_row["CK"]).strip()
-
-            filtered_employees = [e for e in self.employees if e.ck == current_ck]
-
-            rows_needed = max(
-                2, len(filtered_employees) + 3
-            )  # Ensure at least 2 rows for header + 1 empty for appearance
-            table = doc.add_table(rows=rows_needed, cols=8)
-            table.style = "Table Grid"
-
-            col_widths = [5, 15, 15, 12, 23, 12, 12, 6]
-            for row_obj in table.rows:
-                for idx, cell in enumerate(row_obj.cells):
-                    cell.width = Inches(col_widths[idx] / 100 * 7.5)
-
-            headers = [
-                "L.p.",
-                "Nazwisko",
-                "Imię",
-                "Numer Legitymacji",
-                "Funkcja w obiekcie",
-                "Data rozpoczęcia",
-                "Data zakończenia",
-                "Uwagi",
-            ]
-            for i, header in enumerate(headers):
-                cell = table.cell(0, i)
-                cell.text = header
-                cell.paragraphs[0].runs[0].bold = True
-
-            if len(filtered_employees) == 0:
-                contract_name = current_row[
-                    "Oznaczenie strony lub stron umowy, z którymi przedsiębiorca zawarł umowę"
-                ]
-                logger.warning(
-                    f"\nWARNING: No employees found for contract: {contract_name} (CK: {current_ck}, {start_date} - {end_date})"
-                )
-
-            logger.info(
-                f"\nProcessing contract: {current_row['Oznaczenie strony lub stron umowy, z którymi przedsiębiorca zawarł umowę']}"
-            )
-            logger.info(f"CK value: {current_ck}")
-            logger.info(f"Date range: {start_date} to {end_date}")
-            logger.info(f"Found {len(filtered_employees)} matching employees")
-            if not len(filtered_employees) > 0:
-                logger.info("First few matching employees:")
-                logger.info(filtered_employees[:3])
-
-            for idx in range(min(len(filtered_employees), rows_needed - 1)):
-                data_row = table.rows[idx + 1]
-                emp = filtered_employees[idx]
-
-                data_row.cells[0].text = f"{idx + 1}."
-                data_row.cells[1].text = str(emp.last_name)
-                data_row.cells[2].text = str(emp.first_name)
-                data_row.cells[3].text = str(emp.kod)
-                data_row.cells[4].text = str(emp.position)
-                data_row.cells[5].text = str(start_date)
-                data_row.cells[6].text = str(emp.release_date)
-                data_row.cells[7].text = ""
-
-            for idx in range(
-                len(filtered_employees), rows_needed - 1
-            ):  # Fill remaining rows with empty strings
-                data_row = table.rows[idx + 1]
-                for cell in data_row.cells:
-                    cell.text = ""
-
-            # VII. PRACOWNICY OCHRONY SPRAWUJĄCY NADZÓR
-            doc.add_paragraph()
-            para = doc.add_paragraph()
-            run = para.add_run(
-                "VII. PRACOWNICY OCHRONY SPRAWUJĄCY NADZÓR NAD PRACOWNIKAMI OCHRONY WYKONUJĄCYMI USŁUGĘ"
+    def build_contract_job(
+        self,
+        start_date: str,
+        end_date: str,
+        department,
+        current_row,
+        matching_rows: pd.DataFrame | None = None,
+    ) -> ContractJob:
+        """Collect the inputs of one contract from the run's indexes."""
+        if matching_rows is None:
+            matching_rows = self.contract_index.get(
+                current_row["POZ KS R Umów"], self.final_df.iloc[0:0]
             )
-            run.bold = True
-
-            dep_data = self.supervision_data[
-                self.supervision_data["Dział"] == department
-            ].copy()
-            filtered_data = dep_data[
-                (dep_data["rozpoczęcie"] <= pd.to_datetime(end_date))
-                & (
-                    (dep_data["zakończenie"].isna())
-                    | (dep_data["zakończenie"] >= pd.to_datetime(start_date))
-                )
-            ]
+        period_start, _ = self._period_timestamps(start_date, end_date)
+        firearms_cells = self._firearms_cells
+        if period_start != self.period_start:
+            firearms_cells = self._firearms_cells_for_period(period_start)
+        return ContractJob(
+            department=department,
+            start_date=start_date,
+            end_date=end_date,
+            period_start=period_start,
+            current_row=current_row,
+            object_rows=matching_rows,
+            employees=self.employees_by_ck.get(str(current_row["CK"]).strip(), []),
+            supervisors=self.get_active_supervisors(department, start_date, end_date),
+            firearms=firearms_cells.get(department),
+        )
 
-            rows_needed_supervision = max(3, len(filtered_data) + 1)
-            table = doc.add_table(rows=rows_needed_supervision, cols=8)
-            table.style = "Table Grid"
-            col_widths = [5, 15, 15, 12, 23, 12, 12, 6]
-
-            for row_obj in table.rows:
-                for idx, cell in enumerate(row_obj.cells):
-                    cell.width = Inches(col_widths[idx] / 100 * 7.5)
-
-            headers = [
-                "L.p.",
-                "Nazwisko",
-                "Imię",
-                "Numer Legitymacji",
-                "Funkcja w obiekcie",
-                "Daty rozpoczęcie",
-                "Daty zakończenie",
-                "Uwagi",
-            ]
-            for i, header in enumerate(headers):
-                cell = table.cell(0, i)
-                cell.text = header
-                cell.paragraphs[0].runs[0].bold = True
-
-            for idx in range(min(len(filtered_data), rows_needed_supervision - 1)):
-                data_row = table.rows[idx + 1]
-                row_s = filtered_data.iloc[idx]
-
-                start_date_s = ""
-                if pd.notna(row_s["rozpoczęcie"]):
-                    # Use the later of the quarter start or the actual start date
-                    start_date_s = max(
-                        row_s["rozpoczęcie"], pd.to_datetime(start_date)
-                    ).strftime("%Y-%m-%d")
-
-                end_date_s = ""
-                if pd.notna(row_s["zakończenie"]):
-                    end_date_s = row_s["zakończenie"].strftime("%Y-%m-%d")
-                else:
-                    # If no end date, use empty string because it didn't end
-                    end_date_s = ""
-
-                data_row.cells[0].text = f"{idx + 1}."
-                data_row.cells[1].text = str(row_s["Nazwisko"])
-                data_row.cells[2].text = str(row_s["Imię"])
-                data_row.cells[3].text = str(row_s["Nr legitymacji"]).strip('"')
-                data_row.cells[4].text = str(row_s["Funkcja w obiekcie"])
-                data_row.cells[5].text = start_date_s
-                data_row.cells[6].text = end_date_s
-                data_row.cells[7].text = (
-                    str(row_s["Uwagi"]) if pd.notna(row_s["Uwagi"]) else ""
+    def _build_firearms_index(self) -> dict:
+        """
+        First firearms row with an assignment date for every value of the
+        object column (a department or an object), found in one pass.
+        """
+        object_column = "Obiekt, do którego przydzielono pracownikom broń palną"
+        if self.firearms_df.empty or object_column not in self.firearms_df.columns:
+            return {}
+        # Without the assignment dates column no row has an assignment date
+        if "przydział" not in self.firearms_df.columns:
+            return {}
+
+        assigned = self.firearms_df[self.firearms_df["przydział"].notna()]
+        return {
+            key: rows.iloc[0]
+            for key, rows in assigned.groupby(object_column, sort=False, observed=True)
+        }
+
+    def _firearms_cells_for_period(self, period_start: pd.Timestamp) -> dict:
+        """
+        Section VIII rows of the departments in FIREARMS_DEPARTMENTS, with the
+        assignment date clamped to the period start.
+        """
+        cells = {}
+        for department in FIREARMS_DEPARTMENTS:
+            row_f = self.firearms_index.get(department)
+            if row_f is None:
+                continue
+
+            assignment_date_f = ""
+            if pd.notna(row_f["przydział"]):
+                # If assignment date is before quarter start, use quarter start
+                assignment_date_f = max(row_f["przydział"], period_start).strftime(
+                    "%Y-%m-%d"
                 )
 
-            for idx in range(
-                len(filtered_data), rows_needed_supervision - 1
-            ):  # Fill remaining with empty strings
-                data_row = table.rows[idx + 1]
-                for cell in data_row.cells:
-                    cell.text = ""
-
-            # VIII. ILOŚĆ I RODZAJ BRONI PALNEJ
-            doc.add_paragraph()
-            para = doc.add_paragraph()
-            run = para.add_run(
-                "VIII. ILOŚĆ I RODZAJ BRONI PALNEJ PRZYDZIELONEJ PRACOWNIKOM OCHRONY DO WYKONANIA USŁUGI"
-            )
-            run.bold = True
-
-            table = doc.add_table(rows=2, cols=9)
-            table.style = "Table Grid"
-            col_widths = [5, 12, 10, 8, 8, 27, 12, 12, 6]
-
-            for row_obj in table.rows:
-                for idx, cell in enumerate(row_obj.cells):
-                    cell.width = Inches(col_widths[idx] / 100 * 7.5)
-
-            headers = [
-                "L.p.",
-                "Rodzaj broni palnej",
-                "Marka broni",
-                "Kaliber",
-                "Ilość",
-                "Obiekt, do którego przydzielono pracownikom broń palną",
-                "Przydział broni palnej",
-                "Cofnięcie przydziału broni palnej",
-                "Uwagi",
+            assignment_end_date_f = ""
+            # fix csv file
+            # if pd.notna(row_f["cofnięcie przydziału"]):
+            #     assignment_date_f = max(
+            #         row_f["cofnięcie przydziału"], pd.to_datetime(end_date)
+            #     ).strftime("%Y-%m-%d")
+
+            cells[department] = [
+                "1",
+                _cell_text(row_f["Rodzaj broni palnej"]),
+                _cell_text(row_f["Marka broni"]),
+                _cell_text(row_f["Kaliber"]),
+                _cell_text(row_f["Ilość"]),
+                _cell_text(
+                    row_f["Obiekt, do którego przydzielono pracownikom broń palną"]
+                ),
+                assignment_date_f,
+                assignment_end_date_f,
+                _cell_text(row_f["Uwagi"]),
             ]
+        return cells
 
-            for i, header in enumerate(headers):
-                cell = table.cell(0, i)
-                cell.text = header
-                cell.paragraphs[0].runs[0].bold = True
-
-            data_row_firearms = table.rows[1]
-            data_cells_firearms = ["1", "Nie przyznano", "", "", "", "", "", "", ""]
-
-            if department == "MON":
-                mon_firearms = self.firearms_df[
-                    (
-                        self.firearms_df[
-                            "Obiekt, do którego przydzielono pracownikom broń palną"
-                        ]
-                        == "MON"
-                    )
-                    & (self.firearms_df["przydział"].notna())
-                ].copy()
-
-                if not mon_firearms.empty:
-                    row_f = mon_firearms.iloc[0]
-
-                    assignment_date_f = ""
-                    if pd.notna(row_f["przydział"]):
-                        # If assignment date is before quarter start, use quarter start
-                        assignment_date_f = max(
-                            row_f["przydział"], pd.to_datetime(start_date)
-                        ).strftime("%Y-%m-%d")
-
-                    assignment_end_date_f = ""
-                    # fix csv file
-                    # if pd.notna(row_f["cofnięcie przydziału"]):
-                    #     assignment_date_f = max(
-                    #         row_f["cofnięcie przydziału"], pd.to_datetime(end_date)
-                    #     ).strftime("%Y-%m-%d")
-
-                    data_cells_firearms = [
-                        "1",
-                        (
-                            str(row_f["Rodzaj broni palnej"])
-                            if pd.notna(row_f["Rodzaj broni palnej"])
-                            else ""
-                        ),
-                        (
-                            str(row_f["Marka broni"])
-                            if pd.notna(row_f["Marka broni"])
-                            else ""
-                        ),
-                        str(row_f["Kaliber"]) if pd.notna(row_f["Kaliber"]) else "",
-                        str(row_f["Ilość"]) if pd.notna(row_f["Ilość"]) else "",
-                        (
-                            str(
-                                row_f[
-                                    "Obiekt, do którego przydzielono pracownikom broń palną"
-                                ]
-                            )
-                            if pd.notna(
-                                row_f[
-                                    "Obiekt, do którego przydzielono pracownikom broń palną"
-                                ]
-                            )
-                            else ""
-                        ),
-                        assignment_date_f,
-                        assignment_end_date_f,
-                        str(row_f["Uwagi"]) if pd.notna(row_f["Uwagi"]) else "",
-                    ]
-
-            for col, value in enumerate(data_cells_firearms):
-                data_row_firearms.cells[col].text = value
-
-            # IX. ILOŚĆ I RODZAJ ŚRODKÓW PRZYMUSU BEZPOŚREDNIEGO
-            doc.add_paragraph()
-            para = doc.add_paragraph()
-            run = para.add_run(
-                "IX. ILOŚĆ I RODZAJ ŚRODKÓW PRZYMUSU BEZPOŚREDNIEGO PRZYDZIELONYCH PRACOWNIKOM OCHRONY DO WYKONANIA USŁUGI"
+    def _iter_rendered_contracts(
+        self, jobs: List[ContractJob], workers: int = 1, as_xml: bool = False
+    ):
+        """
+        Yield a RenderedContract for every job, in job order, taking unchanged
+        contracts from the fragment cache when the generator has one. When
+        profiling, the section times of every rendered contract are recorded.
+        """
+        if self.fragment_cache is None:
+            rendered = self._render_jobs(jobs, workers, as_xml)
+        else:
+            rendered = _cached_contracts(
+                jobs,
+                self.fragment_cache,
+                lambda misses: self._render_jobs(misses, workers, as_xml=True),
+                as_xml,
             )
-            run.bold = True
-
-            table = doc.add_table(rows=2, cols=6)
-            table.style = "Table Grid"
-            col_widths = [5, 35, 10, 25, 15, 10]
-
-            for row_obj in table.rows:
-                for idx, cell in enumerate(row_obj.cells):
-                    cell.width = Inches(col_widths[idx] / 100 * 7.5)
-
-            headers = [
-                "L.p.",
-                "Rodzaj środka przymusu bezpośredniego",
-                "Ilość",
-                "Obiekt do którego przydzielono pracownikom ś.p.b.",
-                "Daty przydziału",
-                "Uwagi",
-            ]
-
-            for i, header in enumerate(headers):
-                cell = table.cell(0, i)
-                cell.text = header
-                cell.paragraphs[0].runs[0].bold = True
 
-            data_row_coercion = table.rows[1]
-            data_cells_coercion = ["1", "Nie przyznano", "", "", "", ""]
+        if self.profiler is None:
+            yield from rendered
+        else:
+            yield from _record_contracts(self.profiler, jobs, rendered)
 
-            for col, value in enumerate(data_cells_coercion):
-                data_row_coercion.cells[col].text = value
+    def _render_jobs(
+        self, jobs: List[ContractJob], workers: int = 1, as_xml: bool = False
+    ):
+        """
+        Yield a RenderedContract for every job, in job order. Its `content` is
+        the list of rendered body elements, or their serialized XML when
+        `as_xml` is set.
+
+        With more than one worker the contracts are rendered in a process pool.
+        Only a few contracts per worker are in flight at a time, so finished
+        fragments do not pile up in memory while the caller writes them out.
+        """
+        profile = self.profiler is not None
+        if workers > 1 and len(jobs) > 1:
+            # Imported here, a single-worker run never loads multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            job_iter = iter(jobs)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque(
+                    executor.submit(_render_contract_worker, job, profile)
+                    for job in itertools.islice(job_iter, workers * 4)
+                )
+                while pending:
+                    rendered = pending.popleft().result()
+                    next_job = next(job_iter, None)
+                    if next_job is not None:
+                        pending.append(
+                            executor.submit(_render_contract_worker, next_job, profile)
+                        )
+                    if not as_xml:
+                        rendered = rendered._replace(
+                            content=_parse_contract_elements(rendered.content)
+                        )
+                    yield rendered
+        else:
+            yield from _render_contracts(jobs, as_xml, profile)
 
-        except Exception as e:
-            print(
-                f"Error creating document content for POZ KS R Umów {current_row['POZ KS R Umów']}: {e}"
-            )
-            raise
+    def create_document_content(
+        self,
+        doc,
+        start_date: str,
+        end_date: str,
+        department,
+        current_row,
+        matching_rows: pd.DataFrame | None = None,
+    ):
+        render_contract(
+            doc,
+            self.build_contract_job(
+                start_date, end_date, department, current_row, matching_rows
+            ),
+        )
 
     def generate_quarterly_reports(
-        self, output_path: Path, start_date: str, end_date: str
+        self,
+        output_path: Path,
+        start_date: str,
+        end_date: str,
+        workers: int = 1,
+        stream: bool = False,
     ):
-        """Generates kwartalny documents with all records."""
-        try:
+        """
+        Generates kwartalny documents with all records.
 
-            doc = Document()
-
-            # Set document margins
-            for section in doc.sections:
-                section.left_margin = Inches(0.5)
-                section.right_margin = Inches(0.5)
-                section.top_margin = Inches(0.5)
-                section.bottom_margin = Inches(1)
-
-            # Add page numbers
-            self.add_page_numbers(doc)  # Correctly call as a method
-
-            # Ensure 'POZ KS R Umów' and 'Dział' are treated consistently
-            filtered_contracts = self.final_df[
-                self.final_df["POZ KS R Umów"].notna()
-                & (self.final_df["POZ KS R Umów"].astype(str) != "")
-                & (
-                    self.final_df["Świadczenie/ zlecanie podjazdów/ podjazdy"].astype(
-                        str
-                    )
-                    != "P"
-                )
-            ].copy()
-
-            for dept in ["MON", "OFS"]:
-                dept_rows = filtered_contracts[
-                    filtered_contracts["Dział"] == dept
-                ].copy()
+        With `workers` > 1 the contracts are rendered in a process pool and
+        assembled in the original order, producing the same document. With
+        `stream` every finished contract is written straight into the output
+        file instead of building the whole book in memory first.
 
-                for idx, row in dept_rows.iterrows():
-                    contract_start_date = pd.to_datetime(
-                        row["Data rozpoczęcia usługi"], errors="coerce"
-                    )
-                    contract_end_date = pd.to_datetime(
-                        row["Data zakończenia usługi"], errors="coerce"
-                    )
+        With a profiler, the filter, render, page break, assemble and save
+        phases and every contract section are timed.
 
-                    # Filter contracts based on their start and end dates relative to the quarter
-                    # A contract is relevant if it started by the end of the quarter AND (it has no end date OR it ends after the quarter started)
-                    is_active_in_quarter = (
-                        pd.notna(contract_start_date)
-                        and contract_start_date <= pd.to_datetime(end_date)
-                    ) and (
-                        pd.isna(contract_end_date)
-                        or contract_end_date >= pd.to_datetime(start_date)
-                    )
+        Returns the path of the created document, or None when it failed.
+        """
+        try:
+            with _phases(self.profiler)("filter"):
+                jobs = [
+                    self.build_contract_job(start_date, end_date, dept, row)
+                    for dept, row in self.select_active_contracts(start_date, end_date)
+                ]
 
-                    if is_active_in_quarter:
-                        try:
-                            if (
-                                doc.paragraphs and len(doc.paragraphs) > 1
-                            ):  # Add page break only if there's existing content
-                                doc.add_page_break()
+            file_name = f"Raport_{self.start_date}_{self.end_date}.docx"
+            file_path = reserve_unique_file_path(output_path / file_name)
+
+            try:
+                write_report(
+                    self._iter_rendered_contracts(jobs, workers, as_xml=stream),
+                    file_path,
+                    stream,
+                    self.profiler,
+                )
+            except BaseException:
+                file_path.unlink(missing_ok=True)
+                raise
 
-                            self.create_document_content(
-                                doc, start_date, end_date, dept, row
-                            )
+            print(f"Created document: {file_path}")
+            return file_path
 
-                        except Exception as e:
-                            print(
-                                f"Error processing document for {dept} - POZ KS R Umów {row['POZ KS R Umów']}: {e}"
-                            )
+        except Exception as e:
+            print(f"Error in document generation process: {e}")
+            return None
 
-            file_name = f"Raport_{self.start_date}_{self.end_date}.docx"
-            file_path = output_path / file_name
-            file_path = get_unique_file_path(file_path)
-            doc.save(str(file_path))
-            doc.save(str(file_path))
-            print(f"Created document: {file_path}")
+    def _split_key(self, job: ContractJob, split_by: str) -> str:
+        if split_by == "department":
+            return job.department
+        return _contract_key(job)
 
+    def generate_split_reports(
+        self,
+        output_path: Path,
+        start_date: str,
+        end_date: str,
+        split_by: str = "contract",
+        workers: int = 1,
+        stream: bool = False,
+    ):
+        """
+        Generates one document per contract ("POZ KS R Umów") or per department
+        instead of one book, named `Raport_<start>_<end>_umowa_<contract>` or
+        `Raport_<start>_<end>_dzial_<department>`. The marker keeps a contract
+        number apart from the `_1`, `_2` suffix of a repeated combined report.
+
+        With `workers` > 1 the documents are rendered and written concurrently
+        in a process pool, with a bounded number of documents in flight. File
+        names are reserved up front, so concurrent writers never collide.
+
+        With a profiler, the same phases and sections as in
+        generate_quarterly_reports are timed, summed over all documents; the
+        timings of pool workers are added as their documents finish.
+
+        Returns the paths of the documents that were created.
+        """
+        if split_by not in ("contract", "department"):
+            raise Exception(f"Unknown split mode: {split_by}")
+
+        profile = self.profiler is not None
+        try:
+            groups = {}
+            with _phases(self.profiler)("filter"):
+                for dept, row in self.select_active_contracts(start_date, end_date):
+                    job = self.build_contract_job(start_date, end_date, dept, row)
+                    groups.setdefault(self._split_key(job, split_by), []).append(job)
+
+            tasks = []
+            for key, jobs in groups.items():
+                file_name = (
+                    f"Raport_{self.start_date}_{self.end_date}_"
+                    f"{SPLIT_FILE_MARKERS[split_by]}_{key}.docx"
+                )
+                tasks.append((jobs, reserve_unique_file_path(output_path / file_name)))
         except Exception as e:
             print(f"Error in document generation process: {e}")
+            return []
+
+        created = []
+
+        def report_done(
+            file_path: Path,
+            error: BaseException | None,
+            timings: SectionProfiler | None = None,
+        ):
+            if timings is not None:
+                self.profiler.merge(timings)
+            if error is None:
+                created.append(file_path)
+                print(f"Created document: {file_path}")
+            else:
+                file_path.unlink(missing_ok=True)
+                print(f"Error creating document {file_path.name}: {error}")
+
+        if workers <= 1 or len(tasks) <= 1:
+            for jobs, file_path in tasks:
+                error = timings = None
+                try:
+                    timings = _write_report_worker(
+                        jobs, file_path, stream, self.fragment_cache, profile
+                    )
+                except Exception as e:
+                    error = e
+                report_done(file_path, error, timings)
+            return created
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            for jobs, file_path in tasks:
+                if len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report_done(pending.pop(future), *_outcome(future))
+                future = executor.submit(
+                    _write_report_worker,
+                    jobs,
+                    file_path,
+                    stream,
+                    self.fragment_cache,
+                    profile,
+                )
+                pending[future] = file_path
+            for future in as_completed(pending):
+                report_done(pending[future], *_outcome(future))
+        return created
+
+    def generate_batch_reports(
+        self,
+        periods,
+        interval: str,
+        employees_by_period,
+        workers: int = 1,
+        stream: bool = False,
+        split_by: str | None = None,
+    ):
+        """
+        Generates the reports of several periods in one run.
+
+        `periods` holds (start_date, end_date, month, quarter) tuples and
+        `employees_by_period` maps (start_date, end_date) to the employees of
+        that period. The CSVs loaded by this generator are shared by all
+        periods and the active contracts of every period are selected in one
+        vectorized step. Each period goes to its own folder from
+        `create_folder_structure`.
+        """
+        matrix = self.active_contract_matrix(
+            [(start_date, end_date) for start_date, end_date, _, _ in periods]
+        )
+        for (start_date, end_date, month, quarter), active in zip(periods, matrix):
+            try:
+                generator = self.for_period(
+                    month,
+                    quarter,
+                    start_date,
+                    end_date,
+                    interval,
+                    employees_by_period.get((start_date, end_date), []),
+                    active,
+                )
+                output_path = generator.create_folder_structure()
+            except Exception as e:
+                print(f"Skipping period {start_date} - {end_date}: {e}")
+                continue
+
+            if split_by:
+                generator.generate_split_reports(
+                    output_path, start_date, end_date, split_by, workers, stream
+                )
+            else:
+                generator.generate_quarterly_reports(
+                    output_path, start_date, end_date, workers, stream
+                )
 
     def create_folder_structure(self):
         base_dir = Path(os.getcwd())
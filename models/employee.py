@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Iterable, Iterator, Optional, List
 
 
 @dataclass
@@ -100,6 +100,12 @@ class EmployeeFactory:
                 emp.release_date = ""
         return emp
 
+    @staticmethod
+    def iter_from_db_results(db_rows: Iterable) -> Iterator[Employee]:
+        """Create employees one row at a time, e.g. while rows are being fetched"""
+        for row in db_rows:
+            yield EmployeeFactory.create_from_db_result(row)
+
     @staticmethod
     def create_multiple_from_db_results(db_rows) -> List[Employee]:
-        return [EmployeeFactory.create_from_db_result(row) for row in db_rows]
+        return list(EmployeeFactory.iter_from_db_results(db_rows))
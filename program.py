@@ -6,11 +6,22 @@ from configparser import ConfigParser
 from datetime import datetime, date
 import calendar
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+import io
+import threading
 
-from db import DatabaseConnection
-from document_generator import DocumentGenerator
-from services.employee_service import EmployeeService
+from utils.import_timing import ImportTimer
+
+# Installed before anything heavy is imported, so every module gets measured
+IMPORT_TIMER = ImportTimer().install() if "--import-times" in sys.argv else None
+
+# pandas, python-docx and pyodbc are imported where they are first needed
+# (DocumentGenerator, DatabaseConnection), so --help, config errors and the
+# prompts don't wait for them
 from utils.paths import find_data_file, resolve_dir
+from utils.profiling import SectionProfiler
+from utils.report_periods import batch_periods, get_current_dates
 
 
 def configure_logging(debug: bool, log_dir: str = "logs"):
@@ -106,6 +117,185 @@ def load_program_config(config: ConfigParser):
     )
 
 
+def load_fragment_cache(config: ConfigParser, disabled: bool = False):
+    """Fragment cache configured in [cache], or None when it is disabled."""
+    if disabled or not config.getboolean("cache", "enabled", fallback=True):
+        return None
+    from utils.fragment_cache import FragmentCache
+
+    directory = resolve_dir(config.get("cache", "directory", fallback=None), "cache")
+    max_size_mb = config.getint("cache", "max_size_mb", fallback=256)
+    return FragmentCache(directory, max_size_mb * 1024 * 1024)
+
+
+def load_csv_cache(config: ConfigParser, disabled: bool = False):
+    """Cache of parsed input CSVs, in the "csv" folder of the [cache] directory."""
+    if disabled or not config.getboolean("cache", "enabled", fallback=True):
+        return None
+    from utils.csv_cache import CsvCache
+
+    directory = resolve_dir(config.get("cache", "directory", fallback=None), "cache")
+    return CsvCache(directory / "csv")
+
+
+def load_roster_cache(
+    config: ConfigParser, disabled: bool = False, refresh: bool = False
+):
+    """Monthly copy of the employee roster, roster.sqlite3 in the [cache] directory."""
+    if disabled or not config.getboolean("cache", "enabled", fallback=True):
+        return None
+    from repositories.roster_cache import RosterCache
+
+    directory = resolve_dir(config.get("cache", "directory", fallback=None), "cache")
+    return RosterCache(
+        directory / "roster.sqlite3",
+        open_month_ttl=config.getint("cache", "roster_ttl_minutes", fallback=60) * 60,
+        closed_after_days=config.getint(
+            "cache", "roster_closed_after_days", fallback=10
+        ),
+        refresh=refresh,
+    )
+
+
+def preload_inputs(
+    config,
+    args,
+    profiler,
+    firearms_file_path,
+    entities_file_path,
+    supervision_file_path,
+):
+    """Parse the CSVs, importing pandas and python-docx on the way."""
+    from document_generator import DocumentGenerator
+
+    return DocumentGenerator.preload(
+        firearms_file_path,
+        entities_file_path,
+        supervision_file_path,
+        fragment_cache=load_fragment_cache(config, args.no_cache),
+        profiler=profiler,
+        csv_cache=load_csv_cache(config, args.no_cache),
+    )
+
+
+def connect_database(config):
+    """
+    Open the database connection, or return None when it failed. With
+    [database] backend = sqlite the CDN tables are read from a local SQLite
+    file (see benchmarks.synthetic) instead of SQL Server.
+    """
+    try:
+        if config.get("database", "backend", fallback="sqlserver") == "sqlite":
+            from repositories.sqlite_backend import SqliteDatabase
+
+            db = SqliteDatabase.from_config(config)
+        else:
+            from db import DatabaseConnection
+
+            db = DatabaseConnection(config)
+        if db.connect():
+            return db
+    except Exception as e:
+        print(e)
+    print("Failed to connect to database")
+    return None
+
+
+def fetch_employees(db, fetch, roster_cache=None):
+    """
+    Run `fetch(employee_service)` on the connection and close it afterwards.
+    Errors are printed and give None, like an empty result.
+    """
+    from services.employee_service import EmployeeService
+
+    if db is None:
+        return None
+    try:
+        return fetch(EmployeeService(db, roster_cache))
+    except Exception as e:
+        print(e)
+        return None
+    finally:
+        db.close()
+
+
+def run_server(
+    args, config, firearms_file_path, entities_file_path, supervision_file_path
+):
+    """Generate reports on request and at month end until stopped, see report_server."""
+    from report_server import INTERVALS, serve
+
+    schedule = [
+        interval.strip()
+        for interval in config.get("serve", "schedule", fallback="").split(",")
+        if interval.strip()
+    ]
+    for interval in schedule:
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown interval in [serve] schedule: {interval}")
+    schedule_at = datetime.strptime(
+        config.get("serve", "schedule_time", fallback="20:00"), "%H:%M"
+    ).time()
+
+    serve(
+        config,
+        (firearms_file_path, entities_file_path, supervision_file_path),
+        host=config.get("serve", "host", fallback="127.0.0.1"),
+        port=args.port or config.getint("serve", "port", fallback=8765),
+        workers=args.workers,
+        fragment_cache=load_fragment_cache(config, args.no_cache),
+        csv_cache=load_csv_cache(config, args.no_cache),
+        roster_cache=load_roster_cache(config, args.no_cache, args.refresh_roster),
+        schedule_intervals=schedule,
+        schedule_at=schedule_at,
+    )
+
+
+class _HeldThreadOutput:
+    """
+    sys.stdout stand-in keeping what threads named `thread_prefix` print in a
+    buffer until `release`; everything else is written to `stream` right away.
+    """
+
+    def __init__(self, stream, thread_prefix: str):
+        self.stream = stream
+        self.thread_prefix = thread_prefix
+        self._held = io.StringIO()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        if threading.current_thread().name.startswith(self.thread_prefix):
+            with self._lock:
+                if not self._released:
+                    return self._held.write(text)
+        return self.stream.write(text)
+
+    def release(self) -> str:
+        """Stop holding output back and return what was held."""
+        with self._lock:
+            self._released = True
+            return self._held.getvalue()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+@contextmanager
+def thread_output_held(thread_prefix: str):
+    """
+    Hold back what the threads named `thread_prefix` print until the block
+    ends, then print it, so it does not land in the middle of a prompt.
+    """
+    held = _HeldThreadOutput(sys.stdout, thread_prefix)
+    sys.stdout = held
+    try:
+        yield
+    finally:
+        sys.stdout = held.stream
+        print(held.release(), end="")
+
+
 def choose_option(prompt, options):
     print(prompt)
     for i, option in enumerate(options, 1):
@@ -121,25 +311,6 @@ def choose_option(prompt, options):
             print("Please enter a valid number.")
 
 
-def get_current_dates(interval: str):
-    today = date.today()
-    year = today.year
-    month = today.month
-
-    if interval == "miesieczny":
-        start = date(year, month, 1)
-        end = date(year, month, calendar.monthrange(year, month)[1])
-    elif interval == "kwartalny":
-        q_start_month = 3 * ((month - 1) // 3) + 1
-        q_end_month = q_start_month + 2
-        start = date(year, q_start_month, 1)
-        end = date(year, q_end_month, calendar.monthrange(year, q_end_month)[1])
-    else:
-        raise ValueError("Unknown interval")
-
-    return start, end
-
-
 def manual_date_selection():
     interval = choose_option(
         "Wybierz interwał czasowy:", ["Miesieczny", "Kwartalny"]
@@ -172,6 +343,59 @@ def manual_date_selection():
     return start, end, interval, selected_month, q_choice
 
 
+def run_batch(
+    args, config, firearms_file_path, entities_file_path, supervision_file_path
+):
+    """
+    Generate every period between --from and --to in one run: employees of all
+    periods come from a single query and the CSVs are read once.
+    """
+    logger = logging.getLogger(__name__)
+    periods = batch_periods(args.date_from, args.date_to, args.interval)
+    logger.info(
+        f"[BATCH] Generating {len(periods)} {args.interval} report(s) "
+        f"from {periods[0][0]} to {periods[-1][1]}"
+    )
+
+    profiler = SectionProfiler() if args.profile_sections else None
+    # The CSVs are parsed in the background while the employees are fetched
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="startup") as startup:
+        inputs = startup.submit(
+            preload_inputs,
+            config,
+            args,
+            profiler,
+            firearms_file_path,
+            entities_file_path,
+            supervision_file_path,
+        )
+        employees_by_period = (
+            fetch_employees(
+                connect_database(config),
+                lambda service: service.get_employees_by_periods(
+                    [(start_date, end_date) for start_date, end_date, _, _ in periods]
+                ),
+                load_roster_cache(config, args.no_cache, args.refresh_roster),
+            )
+            or {}
+        )
+        if not any(employees_by_period.get(period[:2]) for period in periods):
+            print("No employees found for any period, nothing to generate")
+            return
+        generator = inputs.result()
+
+    generator.generate_batch_reports(
+        periods,
+        args.interval,
+        employees_by_period,
+        workers=args.workers,
+        stream=args.stream,
+        split_by=args.split,
+    )
+    if profiler is not None:
+        print(profiler.report())
+
+
 def main():
     parser = argparse.ArgumentParser()
 
@@ -199,6 +423,71 @@ def main():
         default="miesieczny",
         help="Time interval (for --auto mode)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes rendering contracts in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write contracts into the output file as they are rendered (low memory)",
+    )
+    parser.add_argument(
+        "--split",
+        choices=["contract", "department"],
+        default=None,
+        help="Write one document per contract or per department instead of one book",
+    )
+
+    parser.add_argument(
+        "--from",
+        dest="date_from",
+        default=None,
+        help="Batch mode: first month to generate (YYYY-MM), use with --to and --interval",
+    )
+    parser.add_argument(
+        "--to",
+        dest="date_to",
+        default=None,
+        help="Batch mode: last month to generate (YYYY-MM)",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse the CSVs, query the employees and render every contract again instead of using caches",
+    )
+    parser.add_argument(
+        "--refresh-roster",
+        action="store_true",
+        help="Query the employees of every month again and store them in the roster cache",
+    )
+
+    parser.add_argument(
+        "--profile-sections",
+        action="store_true",
+        help="Time the load/filter/render/save phases and every contract section",
+    )
+
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Keep running and generate reports requested over HTTP and at month end",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="Port of the --serve endpoint (default: [serve] port or 8765)",
+    )
+
+    parser.add_argument(
+        "--import-times",
+        action="store_true",
+        help="Report how long each imported module took to load when the program exits",
+    )
 
     args = parser.parse_args()
     DATA_DIR = resolve_dir(args.data_dir, "data")
@@ -232,26 +521,29 @@ def main():
     quarter = ""
     month = ""
     employees = []
-
-    if args.auto:
-        start_date, end_date = get_current_dates(args.interval)
-        logger.info(f"[AUTO] Generating report from {start_date} to {end_date}")
-    else:
-        start_date, end_date, interval, month, quarter = manual_date_selection()
-        logger.info(f"[MANUAL] Generating report from {start_date} to {end_date}")
-
-    start_date = start_date.strftime("%Y-%m-%d")
-    end_date = end_date.strftime("%Y-%m-%d")
-
-    try:
-        with DatabaseConnection(config) as db:
-            db.connect()
-            employee_service = EmployeeService(db)
-            employees = employee_service.get_employees_by_period(start_date, end_date)
-    except Exception as e:
-        print(e)
-    finally:
-        db.close()
+    profiler = SectionProfiler() if args.profile_sections else None
+
+    if args.serve:
+        run_server(
+            args,
+            config,
+            find_data_file(firearms_file_name, data_dir=str(DATA_DIR)),
+            find_data_file(entities_file_name, data_dir=str(DATA_DIR)),
+            find_data_file(supervision_file_name, data_dir=str(DATA_DIR)),
+        )
+        return
+
+    if args.date_from or args.date_to:
+        if not (args.date_from and args.date_to):
+            raise Exception("Batch mode needs both --from and --to")
+        run_batch(
+            args,
+            config,
+            find_data_file(firearms_file_name, data_dir=str(DATA_DIR)),
+            find_data_file(entities_file_name, data_dir=str(DATA_DIR)),
+            find_data_file(supervision_file_name, data_dir=str(DATA_DIR)),
+        )
+        return
 
     supervision_file_path = find_data_file(
         supervision_file_name, data_dir=str(DATA_DIR)
@@ -259,17 +551,48 @@ def main():
     firearms_file_path = find_data_file(firearms_file_name, data_dir=str(DATA_DIR))
     entities_file_path = find_data_file(entities_file_name, data_dir=str(DATA_DIR))
 
-    generator = DocumentGenerator(
-        firearms_file_path,
-        entities_file_path,
-        supervision_file_path,
-        month,
-        quarter,
-        start_date,
-        end_date,
-        interval,
-        employees,
-    )
+    # The CSVs are parsed and the database connection is opened in the
+    # background while the user picks the dates, then the employee query runs
+    # while the parsing may still be going on. What the background threads
+    # print (driver list, connection attempts) is shown after the prompts.
+    prompts_output = nullcontext() if args.auto else thread_output_held("startup")
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup") as startup:
+        with prompts_output:
+            inputs = startup.submit(
+                preload_inputs,
+                config,
+                args,
+                profiler,
+                firearms_file_path,
+                entities_file_path,
+                supervision_file_path,
+            )
+            database = startup.submit(connect_database, config)
+
+            if args.auto:
+                start_date, end_date = get_current_dates(args.interval)
+                logger.info(f"[AUTO] Generating report from {start_date} to {end_date}")
+            else:
+                start_date, end_date, interval, month, quarter = manual_date_selection()
+                logger.info(
+                    f"[MANUAL] Generating report from {start_date} to {end_date}"
+                )
+
+        start_date = start_date.strftime("%Y-%m-%d")
+        end_date = end_date.strftime("%Y-%m-%d")
+
+        employees = (
+            fetch_employees(
+                database.result(),
+                lambda service: service.get_employees_by_period(start_date, end_date),
+                load_roster_cache(config, args.no_cache, args.refresh_roster),
+            )
+            or []
+        )
+
+        generator = inputs.result().for_period(
+            month, quarter, start_date, end_date, interval, employees
+        )
 
     output_folder_full_path = generator.create_folder_structure()
     if isinstance(output_folder_full_path, Path) == False:
@@ -280,9 +603,37 @@ def main():
             "output_folder_full_path from create_folder_structure() is not valid"
         )
 
-    generator.generate_quarterly_reports(output_folder_full_path, start_date, end_date)
+    if args.split:
+        generator.generate_split_reports(
+            output_folder_full_path,
+            start_date,
+            end_date,
+            split_by=args.split,
+            workers=args.workers,
+            stream=args.stream,
+        )
+    else:
+        generator.generate_quarterly_reports(
+            output_folder_full_path,
+            start_date,
+            end_date,
+            workers=args.workers,
+            stream=args.stream,
+        )
+
+    if profiler is not None:
+        print(profiler.report())
 
 
 if __name__ == "__main__":
-    main()
+    # Required for the process pool (--workers) in the frozen Windows executable
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+
+        multiprocessing.freeze_support()
+    try:
+        main()
+    finally:
+        if IMPORT_TIMER is not None:
+            print(IMPORT_TIMER.report())
     input("Press ENTER to exit")
@@ -0,0 +1,514 @@
+"""
+Long-running report service (program.py --serve).
+
+One process keeps the parsed CSVs, the database connection and the document
+skeleton warm and generates reports on request:
+
+    POST /jobs       {"interval": "kwartalny", "period": "2024-10",
+                      "split": null, "stream": false}
+    GET  /jobs       all known jobs, newest first
+    GET  /jobs/<id>  one job with its status and created files
+    GET  /health     queue length and the next scheduled run
+
+Jobs run one at a time, in the order they were submitted. A built-in
+scheduler submits the current period at the end of every month (and quarter),
+instead of an external task starting the program for it.
+"""
+
+from configparser import ConfigParser
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, time as day_time
+import calendar
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import logging
+from pathlib import Path
+import queue
+import threading
+from typing import List
+
+from utils.report_periods import month_period
+
+logger = logging.getLogger(__name__)
+
+INTERVALS = ("miesieczny", "kwartalny")
+SPLIT_MODES = ("contract", "department")
+
+# Finished jobs kept for GET /jobs, older ones are forgotten
+MAX_FINISHED_JOBS = 200
+
+
+@dataclass
+class ReportJob:
+    """One report request and its progress."""
+
+    id: str
+    interval: str
+    start_date: str
+    end_date: str
+    month: str | None
+    quarter: str | None
+    split_by: str | None = None
+    stream: bool = False
+    source: str = "http"
+    status: str = "queued"
+    files: List[str] = field(default_factory=list)
+    error: str | None = None
+    submitted: datetime = field(default_factory=datetime.now)
+    started: datetime | None = None
+    finished: datetime | None = None
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        for key in ("submitted", "started", "finished"):
+            if data[key] is not None:
+                data[key] = data[key].isoformat(timespec="seconds")
+        return data
+
+
+def _inputs_signature(paths) -> tuple:
+    """Changes whenever one of the input CSVs is modified or replaced."""
+    signature = []
+    for path in paths:
+        stat = Path(path).stat()
+        signature.append((str(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+class ReportService:
+    """
+    Job queue and the warm state the jobs share.
+
+    The CSVs are loaded once (DocumentGenerator.preload) and every job gets
+    its generator through `for_period`; they are loaded again only when one
+    of them changes, and a job without employees leaves them loaded. Jobs
+    run on a single worker thread, so the generator is never used
+    concurrently. Employee queries run on that thread too, on a connection
+    from a ConnectionPool that stays open between jobs (opened by `warm_up`)
+    or on the SQLite file of [database] backend = sqlite, and go through
+    `roster_cache` when given.
+    """
+
+    def __init__(
+        self,
+        config: ConfigParser,
+        input_paths,
+        workers: int = 1,
+        fragment_cache=None,
+        csv_cache=None,
+        roster_cache=None,
+    ):
+        self.config = config
+        self.input_paths = tuple(input_paths)
+        self.workers = workers
+        self.fragment_cache = fragment_cache
+        self.csv_cache = csv_cache
+        self.roster_cache = roster_cache
+
+        self._jobs: dict[str, ReportJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+        self._pool = None
+        self._generator = None
+        self._generator_signature = None
+
+    def submit(
+        self,
+        interval: str,
+        period: str | None = None,
+        split_by: str | None = None,
+        stream: bool = False,
+        source: str = "http",
+    ) -> ReportJob:
+        """
+        Queue the report of the `interval` period containing `period`
+        (YYYY-MM, the current month by default).
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown interval: {interval}")
+        if split_by not in (None, *SPLIT_MODES):
+            raise ValueError(f"Unknown split mode: {split_by}")
+        if period is None:
+            period = date.today().strftime("%Y-%m")
+        start_date, end_date, month, quarter = month_period(period, interval)
+
+        with self._lock:
+            job = ReportJob(
+                id=str(next(self._ids)),
+                interval=interval,
+                start_date=start_date,
+                end_date=end_date,
+                month=month,
+                quarter=quarter,
+                split_by=split_by,
+                stream=bool(stream),
+                source=source,
+            )
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+        self._queue.put(job)
+        logger.info(f"Queued job {job.id}: {interval} {start_date} - {end_date}")
+        return job
+
+    def get(self, job_id: str) -> ReportJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[ReportJob]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: -int(job.id))
+
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def warm(self) -> bool:
+        return self._generator is not None
+
+    def _forget_old_jobs(self):
+        finished = [
+            job
+            for job in self._jobs.values()
+            if job.status in ("done", "failed", "cancelled")
+        ]
+        for job in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._work, name="report-jobs", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Finish the running job, cancel the queued ones and disconnect."""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            job.status = "cancelled"
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def warm_up(self):
+        """Load the skeleton, connect and parse the CSVs before the first job."""
+        from document_generator import report_skeleton_bytes
+
+        report_skeleton_bytes()
+        # The first job tries again whatever fails here
+        if not self._uses_sqlite():
+            try:
+                self._connection_pool().warm_up()
+            except Exception as e:
+                logger.warning(f"Warm-up could not connect: {e}")
+        try:
+            self._preloaded()
+        except Exception as e:
+            logger.warning(f"Warm-up could not load the CSVs: {e}")
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: ReportJob):
+        job.status = "running"
+        job.started = datetime.now()
+        try:
+            employees = self._employees(job.start_date, job.end_date)
+            generator = self._generator_for(
+                job.interval,
+                job.start_date,
+                job.end_date,
+                job.month,
+                job.quarter,
+                employees,
+            )
+            output_path = generator.create_folder_structure()
+            if job.split_by:
+                files = generator.generate_split_reports(
+                    output_path,
+                    job.start_date,
+                    job.end_date,
+                    split_by=job.split_by,
+                    workers=self.workers,
+                    stream=job.stream,
+                )
+            else:
+                file_path = generator.generate_quarterly_reports(
+                    output_path,
+                    job.start_date,
+                    job.end_date,
+                    workers=self.workers,
+                    stream=job.stream,
+                )
+                files = [] if file_path is None else [file_path]
+            if not files:
+                raise Exception("No document was created, see the log for details")
+            job.files = [str(path) for path in files]
+            job.status = "done"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished = datetime.now()
+        logger.info(f"Job {job.id} {job.status}")
+
+    def _connection_pool(self):
+        from db import ConnectionPool
+
+        if self._pool is None:
+            self._pool = ConnectionPool(self.config)
+        return self._pool
+
+    def _uses_sqlite(self) -> bool:
+        return self.config.get("database", "backend", fallback="sqlserver") == "sqlite"
+
+    @contextmanager
+    def _database(self):
+        """
+        A connection for the job thread: borrowed from the pool on SQL Server,
+        or the local file of [database] backend = sqlite, as in batch mode.
+        """
+        if self._uses_sqlite():
+            from repositories.sqlite_backend import SqliteDatabase
+
+            with SqliteDatabase.from_config(self.config) as db:
+                yield db
+        else:
+            with self._connection_pool().connection() as db:
+                yield db
+
+    def _employees(self, start_date: str, end_date: str):
+        from services.employee_service import EmployeeService
+
+        with self._database() as db:
+            return EmployeeService(db, self.roster_cache).get_employees_by_period(
+                start_date, end_date
+            )
+
+    def _preloaded(self):
+        """The generator with the CSVs loaded, loaded again if they changed."""
+        from document_generator import DocumentGenerator
+
+        signature = _inputs_signature(self.input_paths)
+        if self._generator is not None and signature == self._generator_signature:
+            return self._generator
+
+        if self._generator is not None:
+            logger.info("Input CSVs changed, loading them again")
+        self._generator = DocumentGenerator.preload(
+            *self.input_paths,
+            fragment_cache=self.fragment_cache,
+            csv_cache=self.csv_cache,
+        )
+        self._generator_signature = signature
+        return self._generator
+
+    def _generator_for(self, interval, start_date, end_date, month, quarter, employees):
+        """A generator for a period sharing the warm CSVs, see `_preloaded`."""
+        return self._preloaded().for_period(
+            month, quarter, start_date, end_date, interval, employees
+        )
+
+
+def next_month_end(now: datetime, at: day_time) -> datetime:
+    """The first last-day-of-month at `at` that is later than `now`."""
+    year, month = now.year, now.month
+    while True:
+        last_day = calendar.monthrange(year, month)[1]
+        run_at = datetime.combine(date(year, month, last_day), at)
+        if run_at > now:
+            return run_at
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class MonthEndScheduler:
+    """
+    Submits the current period of every configured interval on the last day
+    of the month at `at`. Quarterly reports are submitted only at the end of
+    a quarter.
+    """
+
+    def __init__(self, service: ReportService, intervals, at: day_time):
+        self.service = service
+        self.intervals = list(intervals)
+        self.at = at
+        self.next_run: datetime | None = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if not self.intervals:
+            return
+        self._thread = threading.Thread(
+            target=self._loop, name="month-end-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self.next_run = next_month_end(datetime.now(), self.at)
+            logger.info(f"Next scheduled reports at {self.next_run}")
+            # Wake up at least hourly, so clock changes don't delay the run much
+            while not self._stopped.is_set():
+                remaining = (self.next_run - datetime.now()).total_seconds()
+                if remaining <= 0:
+                    break
+                self._stopped.wait(min(remaining, 3600))
+            if self._stopped.is_set():
+                return
+            self.run_due(self.next_run.date())
+            # Don't fire twice when the wait ended a moment early
+            self._stopped.wait(1)
+
+    def run_due(self, day: date):
+        period = day.strftime("%Y-%m")
+        for interval in self.intervals:
+            if interval == "kwartalny" and day.month % 3 != 0:
+                continue
+            self.service.submit(interval, period, source="schedule")
+
+
+def parse_job_request(body: bytes) -> dict:
+    """
+    Arguments of ReportService.submit from a POST /jobs body. Raises
+    ValueError, answered with 400, when the body is not a JSON object or a
+    field has the wrong type.
+    """
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(request, dict):
+        raise ValueError("Expected a JSON object")
+
+    fields = {
+        "interval": request.get("interval", "miesieczny"),
+        "period": request.get("period"),
+        "split": request.get("split"),
+    }
+    for name, value in fields.items():
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f'"{name}" must be a string')
+    if fields["interval"] is None:
+        raise ValueError('"interval" must be a string')
+
+    stream = request.get("stream", False)
+    if not isinstance(stream, bool):
+        raise ValueError('"stream" must be true or false')
+
+    return {
+        "interval": fields["interval"],
+        "period": fields["period"],
+        "split_by": fields["split"],
+        "stream": stream,
+    }
+
+
+def _handler_class(service: ReportService, scheduler: MonthEndScheduler):
+    class ReportRequestHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.info("%s %s", self.address_string(), format % args)
+
+        def _send_json(self, status: HTTPStatus, data):
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.rstrip("/")
+            if path == "/health":
+                next_run = scheduler.next_run
+                self._send_json(
+                    HTTPStatus.OK,
+                    {
+                        "status": "ok",
+                        "warm": service.warm,
+                        "queued": service.queued(),
+                        "next_scheduled_run": (
+                            next_run.isoformat(timespec="seconds") if next_run else None
+                        ),
+                    },
+                )
+            elif path == "/jobs":
+                self._send_json(
+                    HTTPStatus.OK, [job.to_dict() for job in service.jobs()]
+                )
+            elif path.startswith("/jobs/"):
+                job = service.get(path[len("/jobs/") :])
+                if job is None:
+                    self._send_json(HTTPStatus.NOT_FOUND, {"error": "Unknown job"})
+                else:
+                    self._send_json(HTTPStatus.OK, job.to_dict())
+            else:
+                self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                job = service.submit(**parse_job_request(self.rfile.read(length)))
+            except ValueError as e:
+                self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+                return
+            self._send_json(HTTPStatus.ACCEPTED, job.to_dict())
+
+    return ReportRequestHandler
+
+
+def serve(
+    config: ConfigParser,
+    input_paths,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    workers: int = 1,
+    fragment_cache=None,
+    csv_cache=None,
+    roster_cache=None,
+    schedule_intervals=(),
+    schedule_at: day_time = day_time(20, 0),
+):
+    """Run the report service until interrupted (Ctrl+C)."""
+    service = ReportService(
+        config, input_paths, workers, fragment_cache, csv_cache, roster_cache
+    )
+    scheduler = MonthEndScheduler(service, schedule_intervals, schedule_at)
+    server = ThreadingHTTPServer((host, port), _handler_class(service, scheduler))
+
+    service.warm_up()
+    service.start()
+    scheduler.start()
+    print(f"Serving reports on http://{host}:{server.server_port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        scheduler.stop()
+        service.stop()
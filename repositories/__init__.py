@@ -6,11 +6,19 @@ This module contains repository classes that handle database queries
 and data retrieval operations.
 """
 
-from .employee_repository import EmployeeRepository
+from .backend import RepositoryBackend
+from .employee_repository import EmployeeRepository, SqlServerBackend
+from .roster_cache import RosterCache
+from .sqlite_backend import SqliteBackend, SqliteDatabase
 
 # Export main classes for easy importing
 __all__ = [
     'EmployeeRepository',
+    'RepositoryBackend',
+    'RosterCache',
+    'SqlServerBackend',
+    'SqliteBackend',
+    'SqliteDatabase',
 ]
 
 # Version info
@@ -0,0 +1,36 @@
+from abc import ABC, abstractmethod
+
+
+class RepositoryBackend(ABC):
+    """
+    SQL dialect of the database the repositories query.
+
+    Every query the repositories send comes from the backend of their
+    connection, so the same repository code runs on SQL Server
+    (SqlServerBackend) and on a local SQLite copy of the CDN tables
+    (SqliteBackend). Queries take positional parameters and return rows in
+    the same shape on every backend.
+    """
+
+    # Short name, e.g. for the [database] backend option
+    name: str = ""
+
+    # Parameters: date_from, date_to ('YYYY-MM-DD')
+    # (employee_id, employee_name, kod, project_code, employment_end, released)
+    employees_with_project_codes_sql: str = ""
+    # (employee_id,) of the employees with a counted payslip in the range
+    paid_employees_sql: str = ""
+    # (employee_id, project_code) of the projects planned in the range
+    planned_projects_sql: str = ""
+    # No parameters: (employee_id, employee_name, kod, employment_end) of
+    # every current employment record
+    current_employees_sql: str = ""
+    # (employee_id, employee_name) of all active employees
+    active_employees_sql: str = ""
+
+    @abstractmethod
+    def employees_for_periods_sql(self, period_count: int) -> str:
+        """
+        Query of employees_with_project_codes_sql for `period_count` ranges,
+        parameters (period_index, date_from, date_to) for every range.
+        """
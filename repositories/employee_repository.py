@@ -1,26 +1,9 @@
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 
+from .backend import RepositoryBackend
 
-class EmployeeRepository:
-    """Repository for employee-related database operations"""
-
-    def __init__(self, db_connection):
-        self.db = db_connection
-
-    def get_employees_with_project_codes(
-        self, date_from: str, date_to: str
-    ) -> List[Tuple]:
-        """
-        Get list of employees with their project codes for a given date range
-
-        Args:
-            date_from: Start date in format 'YYYY-MM-DD'
-            date_to: End date in format 'YYYY-MM-DD'
-
-        Returns:
-            List of tuples: (employee_id, employee_name, project_code)
-        """
-        sql_query = """
+# Parameters: date_from, date_to ('YYYY-MM-DD')
+EMPLOYEES_WITH_PROJECT_CODES_SQL = """
         DECLARE @data_od varchar(25) = ?; 
         DECLARE @data_do varchar(25) = ?;
         
@@ -65,17 +48,111 @@ class EmployeeRepository:
         ORDER BY lp.IdPracownika
         """
 
-        try:
-            return self.db.execute_query(sql_query, (date_from, date_to))
-        except Exception as e:
-            print(f"Error executing employee query: {e}")
-            return []
+# EMPLOYEES_WITH_PROJECT_CODES_SQL split into the parts that, unlike the joined
+# rows, can be united across date ranges: who was paid and who was planned on
+# which project (parameters: date_from, date_to), and the current employment
+# records the employee attributes come from (no parameters)
 
-    def get_active_employees(self) -> List[Tuple]:
+# Employees with a counted payslip in the range: (employee_id,)
+PAID_EMPLOYEES_SQL = """
+        SELECT  DISTINCT wyp.WPL_PraId
+        FROM CDN.Wyplaty AS wyp
+        INNER JOIN CDN.WypElementy AS ele
+        ON wyp.WPL_WplId = ele.WPE_WplId
+        WHERE wyp.WPL_DataOd >= ?
+        AND wyp.WPL_DataOd <= ?
+        AND UPPER(ele.WPE_Nazwa) not LIKE '%SODIR%'
+        AND UPPER(ele.WPE_Nazwa) not LIKE '%ZFRON%'
+        AND UPPER(ele.WPE_Nazwa) not LIKE '%PZU%'
+        AND UPPER(ele.WPE_Nazwa) not LIKE '%KOMORNICZE%'
+        AND UPPER(ele.WPE_Nazwa) not LIKE '%ZASI%'
         """
-        Get list of all active employees
+
+# Current employment records: (employee_id, employee_name, kod, employment_end)
+CURRENT_EMPLOYEES_SQL = """
+        SELECT  DISTINCT p.PRE_PraId
+            ,LTRIM(RTRIM(p.PRE_Imie1)) + ' ' + LTRIM(RTRIM(p.PRE_Nazwisko))
+            ,p.PRE_Kod
+            ,p.PRE_ZatrudnionyDo
+        FROM CDN.PracEtaty AS p
+        WHERE p.PRE_DataDo >= CONVERT(datetime, '2999-12-31', 120)
+        """
+
+# Projects employees were planned on in the range: (employee_id, project_code)
+PLANNED_PROJECTS_SQL = """
+        SELECT  DISTINCT pld.PPL_PraId
+            ,dp.PRJ_Kod
+        FROM CDN.PracPlanDni pld
+        INNER JOIN CDN.PracPlanDniGodz pldg
+        ON pldg.PGL_PplId = pld.PPL_PplId
+        INNER JOIN CDN.DefProjekty dp
+        ON pldg.PGL_PrjId = dp.PRJ_PrjId
+        WHERE pld.PPL_Data >= ?
+        AND pld.PPL_Data <= ?
+        AND pld.PPL_TypDnia = 1
+        """
+
+
+def employees_for_periods_sql(period_count: int) -> str:
+    """
+    Query of EmployeeRepository.get_employees_with_project_codes_for_periods,
+    the same text for every call with the same number of periods
+    """
+    values = ", ".join("(?, ?, ?)" for _ in range(period_count))
+    return f"""
+        WITH Okresy AS
+        (
+            SELECT Okres, CONVERT(datetime, DataOd, 120) AS DataOd, CONVERT(datetime, DataDo, 120) AS DataDo
+            FROM (VALUES {values}) AS o(Okres, DataOd, DataDo)
+        ),
+        ListaPracownikow AS
+        (
+            SELECT  DISTINCT o.Okres
+                ,o.DataOd
+                ,o.DataDo
+                ,p.PRE_PraId                                                                 AS IdPracownika
+                ,LTRIM(RTRIM(p.PRE_Imie1)) + ' ' + LTRIM(RTRIM(p.PRE_Nazwisko))              AS Pracownik
+                ,p.PRE_Kod                                                                   AS Kod
+                ,CASE WHEN wyp.WPL_NumerPelny not LIKE 'U%' THEN 'etat'  ELSE 'zlecenie' END AS TypZatrudnienia
+                ,wyp.WPL_NumerPelny
+                ,p.PRE_ZatrudnionyDo AS KoniecZatrudnienia
+            FROM Okresy AS o
+            INNER JOIN CDN.Wyplaty AS wyp
+            ON wyp.WPL_DataOd >= o.DataOd
+            AND wyp.WPL_DataOd <= o.DataDo
+            INNER JOIN CDN.PracEtaty AS p
+            ON wyp.WPL_PraId = p.PRE_PraId
+            INNER JOIN CDN.WypElementy AS ele
+            ON wyp.WPL_WplId = ele.WPE_WplId
+            WHERE p.PRE_DataDo >= CONVERT(datetime, '2999-12-31', 120)
+            AND UPPER(ele.WPE_Nazwa) not LIKE '%SODIR%'
+            AND UPPER(ele.WPE_Nazwa) not LIKE '%ZFRON%'
+            AND UPPER(ele.WPE_Nazwa) not LIKE '%PZU%'
+            AND UPPER(ele.WPE_Nazwa) not LIKE '%KOMORNICZE%'
+            AND UPPER(ele.WPE_Nazwa) not LIKE '%ZASI%'
+        )
+        SELECT  DISTINCT lp.Okres
+            ,lp.IdPracownika
+            ,lp.Pracownik
+            ,lp.Kod
+            ,dp.PRJ_Kod
+            ,lp.KoniecZatrudnienia
+            ,CASE WHEN lp.KoniecZatrudnienia BETWEEN lp.DataOd AND lp.DataDo THEN 1 ELSE 0 END
+        FROM ListaPracownikow lp
+        INNER JOIN CDN.PracPlanDni pld
+        ON pld.PPL_PraId = lp.IdPracownika
+        INNER JOIN CDN.PracPlanDniGodz pldg
+        ON pldg.PGL_PplId = pld.PPL_PplId
+        INNER JOIN CDN.DefProjekty dp
+        ON pldg.PGL_PrjId = dp.PRJ_PrjId
+        WHERE pld.PPL_Data >= lp.DataOd
+        AND pld.PPL_Data <= lp.DataDo
+        AND pld.PPL_TypDnia = 1
+        ORDER BY lp.Okres, lp.IdPracownika
         """
-        sql_query = """
+
+
+ACTIVE_EMPLOYEES_SQL = """
         SELECT  distinct(p.PRE_PraId)                                                       AS IdPracownika
 	       ,p.PRE_Nazwisko + ' ' +p.PRE_Imie1                                           AS Pracownik
         FROM CDN.PracEtaty AS p
@@ -94,8 +171,155 @@ class EmployeeRepository:
         ORDER BY p.PRE_PraId 
         """
 
+
+class SqlServerBackend(RepositoryBackend):
+    """T-SQL queries against the CDN tables on SQL Server"""
+
+    name = "sqlserver"
+    employees_with_project_codes_sql = EMPLOYEES_WITH_PROJECT_CODES_SQL
+    paid_employees_sql = PAID_EMPLOYEES_SQL
+    current_employees_sql = CURRENT_EMPLOYEES_SQL
+    planned_projects_sql = PLANNED_PROJECTS_SQL
+    active_employees_sql = ACTIVE_EMPLOYEES_SQL
+
+    def employees_for_periods_sql(self, period_count: int) -> str:
+        return employees_for_periods_sql(period_count)
+
+
+SQL_SERVER_BACKEND = SqlServerBackend()
+
+
+class EmployeeRepository:
+    """Repository for employee-related database operations"""
+
+    def __init__(self, db_connection, backend: RepositoryBackend = None):
+        self.db = db_connection
+        # Queries come from the backend given here, else from the one of the
+        # connection (e.g. SqliteDatabase), else they are T-SQL
+        self.backend = (
+            backend or getattr(db_connection, "backend", None) or SQL_SERVER_BACKEND
+        )
+
+    def get_employees_with_project_codes(
+        self, date_from: str, date_to: str
+    ) -> List[Tuple]:
+        """
+        Get list of employees with their project codes for a given date range
+
+        Args:
+            date_from: Start date in format 'YYYY-MM-DD'
+            date_to: End date in format 'YYYY-MM-DD'
+
+        Returns:
+            List of tuples: (employee_id, employee_name, project_code)
+        """
+
+        try:
+            return self.db.execute_query(
+                self.backend.employees_with_project_codes_sql, (date_from, date_to)
+            )
+        except Exception as e:
+            print(f"Error executing employee query: {e}")
+            return []
+
+    def iter_employees_with_project_codes(
+        self, date_from: str, date_to: str
+    ) -> Iterator[Tuple]:
+        """
+        Rows of get_employees_with_project_codes, fetched from the server in
+        batches while they are consumed. Errors are raised to the caller.
+        """
+        return self.db.iter_query(
+            self.backend.employees_with_project_codes_sql, (date_from, date_to)
+        )
+
+    def get_employees_with_project_codes_for_periods(
+        self, periods: List[Tuple[str, str]]
+    ) -> List[Tuple]:
+        """
+        Same as get_employees_with_project_codes, but for many date ranges in a
+        single query and round trip
+
+        Args:
+            periods: List of (date_from, date_to) in format 'YYYY-MM-DD'
+
+        Returns:
+            List of tuples: (period_index, employee_id, employee_name, ...), where
+            period_index is the position of the range in `periods`
+        """
+        if not periods:
+            return []
+
+        try:
+            return self.db.execute_query(
+                self.backend.employees_for_periods_sql(len(periods)),
+                self._period_params(periods),
+            )
+        except Exception as e:
+            print(f"Error executing employee query: {e}")
+            return []
+
+    def iter_employees_with_project_codes_for_periods(
+        self, periods: List[Tuple[str, str]]
+    ) -> Iterator[Tuple]:
+        """
+        Rows of get_employees_with_project_codes_for_periods, fetched from the
+        server in batches while they are consumed. Errors are raised to the
+        caller.
+        """
+        if not periods:
+            return iter(())
+        return self.db.iter_query(
+            self.backend.employees_for_periods_sql(len(periods)),
+            self._period_params(periods),
+        )
+
+    def get_roster_parts(
+        self, date_from: str, date_to: str
+    ) -> Tuple[List[int], List[Tuple]]:
+        """
+        Ids of the employees paid in a date range and the (employee_id,
+        project_code) pairs planned in it, the monthly partitions of the
+        roster cache. Errors are raised to the caller, so a failed fetch is
+        never cached as an empty month.
+        """
+        paid = [
+            row[0]
+            for row in self.db.iter_query(
+                self.backend.paid_employees_sql, (date_from, date_to)
+            )
+        ]
+        planned = [
+            tuple(row)
+            for row in self.db.iter_query(
+                self.backend.planned_projects_sql, (date_from, date_to)
+            )
+        ]
+        return paid, planned
+
+    def get_current_employees(self) -> List[Tuple]:
+        """
+        (employee_id, employee_name, kod, employment_end) of every current
+        employment record. Errors are raised to the caller.
+        """
+        return [
+            tuple(row) for row in self.db.iter_query(self.backend.current_employees_sql)
+        ]
+
+    @staticmethod
+    def _period_params(periods: List[Tuple[str, str]]) -> Tuple:
+        params = []
+        for index, (date_from, date_to) in enumerate(periods):
+            params.extend((index, date_from, date_to))
+        return tuple(params)
+
+    def get_active_employees(self) -> List[Tuple]:
+        """
+        Get list of all active employees
+        """
+
         try:
-            return self.db.execute_query(sql_query)
+            return self.db.execute_query(self.backend.active_employees_sql)
         except Exception as e:
             print(f"Error getting active employees: {e}")
             return []
@@ -0,0 +1,262 @@
+import calendar
+from datetime import date, datetime, timedelta
+import hashlib
+import logging
+from pathlib import Path
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+
+from .backend import RepositoryBackend
+
+logger = logging.getLogger(__name__)
+
+# How long the partition of a month that is still open may be reused
+DEFAULT_OPEN_MONTH_TTL_SECONDS = 60 * 60
+# Payroll of a month is still corrected for a few days after it ends; only
+# then the month counts as closed and its partition is kept for good
+DEFAULT_CLOSED_AFTER_DAYS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roster_months (
+    query TEXT NOT NULL,
+    month TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (query, month)
+);
+CREATE TABLE IF NOT EXISTS roster_paid (
+    query TEXT NOT NULL,
+    month TEXT NOT NULL,
+    employee_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS roster_paid_month ON roster_paid (query, month);
+CREATE TABLE IF NOT EXISTS roster_planned (
+    query TEXT NOT NULL,
+    month TEXT NOT NULL,
+    employee_id INTEGER,
+    project_code TEXT
+);
+CREATE INDEX IF NOT EXISTS roster_planned_month ON roster_planned (query, month);
+"""
+
+
+def query_key(backend: RepositoryBackend) -> str:
+    """
+    Identifies the queries partitions are filled with, so entries written by
+    an older query or another backend are never read
+    """
+    text = backend.name + backend.paid_employees_sql + backend.planned_projects_sql
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def month_bounds(month: str) -> Tuple[date, date]:
+    """First and last day of a month given as YYYY-MM."""
+    first = datetime.strptime(month, "%Y-%m").date()
+    last_day = calendar.monthrange(first.year, first.month)[1]
+    return first, first.replace(day=last_day)
+
+
+def months_of_range(date_from: str, date_to: str) -> Optional[List[str]]:
+    """
+    The months (YYYY-MM) making up a date range, or None when the range does
+    not start on the first and end on the last day of a month.
+    """
+    start = datetime.strptime(date_from, "%Y-%m-%d").date()
+    end = datetime.strptime(date_to, "%Y-%m-%d").date()
+    if start.day != 1 or end != month_bounds(end.strftime("%Y-%m"))[1]:
+        return None
+    if start > end:
+        return None
+
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def combine_roster_parts(
+    paid, planned, current, date_from: str, date_to: str
+) -> List[Tuple]:
+    """
+    Rows of EmployeeRepository.get_employees_with_project_codes for a range,
+    built from the paid employee ids and planned projects of its months and
+    the current employment records: every employee paid in the range, once
+    per project they were planned on in it. Names, codes and release dates
+    come only from `current`, so they are the same in every month.
+    """
+    range_start = datetime.strptime(date_from, "%Y-%m-%d")
+    range_end = datetime.strptime(date_to, "%Y-%m-%d")
+
+    paid = set(paid)
+    records = {}
+    for row in set(current):
+        if row[0] in paid:
+            records.setdefault(row[0], []).append(row)
+
+    rows = set()
+    for employee_id, project_code in set(planned):
+        for _, name, kod, employment_end in records.get(employee_id, ()):
+            released = (
+                employment_end is not None
+                and range_start <= employment_end <= range_end
+            )
+            rows.add(
+                (
+                    employee_id,
+                    name,
+                    kod,
+                    project_code,
+                    employment_end,
+                    1 if released else 0,
+                )
+            )
+    return sorted(rows, key=lambda row: (row[0], str(row[3]), str(row[1])))
+
+
+class RosterCache:
+    """
+    Local SQLite copy of the employee roster, one partition per month.
+
+    A partition holds the ids of the employees paid in the month and the
+    projects they were planned on. Any range of whole months (a quarter, a
+    year) is put together from its months and the current employment
+    records, read on every call, exactly as the joined roster query would
+    return it; a name or release date changed after a month was cached never
+    shows up next to the old one. Closed months never change and are fetched
+    once; a month that is still open is fetched again once its partition is
+    older than `open_month_ttl` seconds. With `refresh` every month is
+    fetched again the first time it is needed.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        open_month_ttl: float = DEFAULT_OPEN_MONTH_TTL_SECONDS,
+        closed_after_days: int = DEFAULT_CLOSED_AFTER_DAYS,
+        refresh: bool = False,
+    ):
+        self.path = Path(path)
+        self.open_month_ttl = open_month_ttl
+        self.closed_after_days = closed_after_days
+        self.refresh = refresh
+        # Months already fetched again with `refresh`
+        self._refreshed = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def closes_at(self, month: str) -> float:
+        """Timestamp from which a month counts as closed."""
+        _, last = month_bounds(month)
+        closing_day = last + timedelta(days=1 + self.closed_after_days)
+        return datetime.combine(closing_day, datetime.min.time()).timestamp()
+
+    def _is_fresh(self, month: str, fetched_at: float, now: float) -> bool:
+        closes_at = self.closes_at(month)
+        if fetched_at >= closes_at:
+            return True
+        return now < closes_at and now - fetched_at < self.open_month_ttl
+
+    def get_month(self, query: str, month: str):
+        """
+        The (paid, planned) rows of a month filled by the queries with
+        key `query`, or None when not usable.
+        """
+        if self.refresh and (query, month) not in self._refreshed:
+            return None
+        conn = self._connect()
+        try:
+            entry = conn.execute(
+                "SELECT fetched_at FROM roster_months WHERE query = ? AND month = ?",
+                (query, month),
+            ).fetchone()
+            if entry is None or not self._is_fresh(month, entry[0], time.time()):
+                return None
+
+            paid = [
+                employee_id
+                for (employee_id,) in conn.execute(
+                    "SELECT employee_id FROM roster_paid WHERE query = ? AND month = ?",
+                    (query, month),
+                )
+            ]
+            planned = conn.execute(
+                "SELECT employee_id, project_code FROM roster_planned "
+                "WHERE query = ? AND month = ?",
+                (query, month),
+            ).fetchall()
+            return paid, planned
+        finally:
+            conn.close()
+
+    def put_month(
+        self, query: str, month: str, paid, planned, fetched_at: float = None
+    ):
+        """Replace the partition of a month."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        conn = self._connect()
+        try:
+            with conn:
+                key = (query, month)
+                conn.execute(
+                    "DELETE FROM roster_paid WHERE query = ? AND month = ?", key
+                )
+                conn.execute(
+                    "DELETE FROM roster_planned WHERE query = ? AND month = ?", key
+                )
+                conn.executemany(
+                    "INSERT INTO roster_paid VALUES (?, ?, ?)",
+                    [(*key, employee_id) for employee_id in paid],
+                )
+                conn.executemany(
+                    "INSERT INTO roster_planned VALUES (?, ?, ?, ?)",
+                    [(*key, employee_id, project) for employee_id, project in planned],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO roster_months VALUES (?, ?, ?)",
+                    (*key, fetched_at),
+                )
+        finally:
+            conn.close()
+        self._refreshed.add((query, month))
+
+    def employees_with_project_codes(
+        self, repository, date_from: str, date_to: str
+    ) -> List[Tuple]:
+        """
+        Roster rows of a range of whole months; months without a usable
+        partition are fetched through `repository` and stored, the current
+        employment records are always read from it. Errors are raised to the
+        caller, nothing is stored for a failed month.
+        """
+        months = months_of_range(date_from, date_to)
+        if months is None:
+            raise ValueError(f"Not a range of whole months: {date_from} - {date_to}")
+
+        query = query_key(repository.backend)
+        paid, planned = [], []
+        fetched = 0
+        for month in months:
+            parts = self.get_month(query, month)
+            if parts is None:
+                first, last = month_bounds(month)
+                parts = repository.get_roster_parts(
+                    first.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d")
+                )
+                self.put_month(query, month, *parts)
+                fetched += 1
+            paid.extend(parts[0])
+            planned.extend(parts[1])
+
+        logger.info(
+            f"Roster cache: {len(months) - fetched} month(s) reused, "
+            f"{fetched} fetched for {date_from} - {date_to}"
+        )
+        return combine_roster_parts(
+            paid, planned, repository.get_current_employees(), date_from, date_to
+        )
@@ -0,0 +1,351 @@
+from datetime import datetime
+from pathlib import Path
+import sqlite3
+import time
+from typing import Any, Iterator, List, Optional, Tuple
+
+from .backend import RepositoryBackend
+
+# Rows fetched per step when reading results, as DatabaseConnection does
+DEFAULT_FETCH_ARRAYSIZE = 1000
+
+# The CDN tables (and columns) the repositories read, as on SQL Server. Dates
+# are stored as 'YYYY-MM-DD' text and read back as datetime like from pyodbc
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS PracEtaty (
+    PRE_PreId INTEGER PRIMARY KEY,
+    PRE_PraId INTEGER NOT NULL,
+    PRE_Kod TEXT,
+    PRE_Imie1 TEXT,
+    PRE_Nazwisko TEXT,
+    PRE_DataOd DATETIME,
+    PRE_DataDo DATETIME,
+    PRE_ZatrudnionyDo DATETIME
+);
+CREATE INDEX IF NOT EXISTS PracEtaty_PraId ON PracEtaty (PRE_PraId);
+
+CREATE TABLE IF NOT EXISTS Wyplaty (
+    WPL_WplId INTEGER PRIMARY KEY,
+    WPL_PraId INTEGER NOT NULL,
+    WPL_NumerPelny TEXT,
+    WPL_DataOd DATETIME,
+    WPL_DataDo DATETIME
+);
+CREATE INDEX IF NOT EXISTS Wyplaty_DataOd ON Wyplaty (WPL_DataOd, WPL_PraId);
+
+CREATE TABLE IF NOT EXISTS WypElementy (
+    WPE_WpeId INTEGER PRIMARY KEY,
+    WPE_WplId INTEGER NOT NULL,
+    WPE_Nazwa TEXT,
+    WPE_Wartosc REAL
+);
+CREATE INDEX IF NOT EXISTS WypElementy_WplId ON WypElementy (WPE_WplId);
+
+CREATE TABLE IF NOT EXISTS PracPlanDni (
+    PPL_PplId INTEGER PRIMARY KEY,
+    PPL_PraId INTEGER NOT NULL,
+    PPL_Data DATETIME,
+    PPL_TypDnia INTEGER
+);
+CREATE INDEX IF NOT EXISTS PracPlanDni_PraId ON PracPlanDni (PPL_PraId, PPL_Data);
+
+CREATE TABLE IF NOT EXISTS PracPlanDniGodz (
+    PGL_PglId INTEGER PRIMARY KEY,
+    PGL_PplId INTEGER NOT NULL,
+    PGL_PrjId INTEGER
+);
+CREATE INDEX IF NOT EXISTS PracPlanDniGodz_PplId ON PracPlanDniGodz (PGL_PplId);
+
+CREATE TABLE IF NOT EXISTS DefProjekty (
+    PRJ_PrjId INTEGER PRIMARY KEY,
+    PRJ_Kod TEXT,
+    PRJ_Nazwa TEXT
+);
+"""
+
+# Payslip elements that don't count as pay, the same list as in the T-SQL
+_PAYROLL_FILTER = """
+        AND UPPER(ele.WPE_Nazwa) NOT LIKE '%SODIR%'
+        AND UPPER(ele.WPE_Nazwa) NOT LIKE '%ZFRON%'
+        AND UPPER(ele.WPE_Nazwa) NOT LIKE '%PZU%'
+        AND UPPER(ele.WPE_Nazwa) NOT LIKE '%KOMORNICZE%'
+        AND UPPER(ele.WPE_Nazwa) NOT LIKE '%ZASI%'"""
+
+# SQLite version of EMPLOYEES_WITH_PROJECT_CODES_SQL, ?1 and ?2 stand for
+# @data_od and @data_do
+EMPLOYEES_WITH_PROJECT_CODES_SQL = f"""
+        WITH ListaPracownikow AS
+        (
+            SELECT  DISTINCT p.PRE_PraId                                                     AS IdPracownika
+                ,TRIM(p.PRE_Imie1) || ' ' || TRIM(p.PRE_Nazwisko)                           AS Pracownik
+                ,p.PRE_Kod                                                                   AS Kod
+                ,CASE WHEN wyp.WPL_NumerPelny NOT LIKE 'U%' THEN 'etat' ELSE 'zlecenie' END  AS TypZatrudnienia
+                ,wyp.WPL_NumerPelny
+                ,p.PRE_ZatrudnionyDo                                                         AS KoniecZatrudnienia
+            FROM CDN.PracEtaty AS p
+            INNER JOIN CDN.Wyplaty AS wyp
+            ON wyp.WPL_PraId = p.PRE_PraId
+            INNER JOIN CDN.WypElementy AS ele
+            ON wyp.WPL_WplId = ele.WPE_WplId
+            WHERE p.PRE_DataDo >= '2999-12-31'
+            AND wyp.WPL_DataOd >= ?1
+            AND wyp.WPL_DataOd <= ?2{_PAYROLL_FILTER}
+        )
+        SELECT  DISTINCT lp.IdPracownika
+            ,lp.Pracownik
+            ,lp.Kod
+            ,dp.PRJ_Kod
+            ,lp.KoniecZatrudnienia
+            ,CASE WHEN lp.KoniecZatrudnienia BETWEEN ?1 AND ?2 THEN 1 ELSE 0 END
+        FROM ListaPracownikow lp
+        INNER JOIN CDN.PracPlanDni pld
+        ON pld.PPL_PraId = lp.IdPracownika
+        INNER JOIN CDN.PracPlanDniGodz pldg
+        ON pldg.PGL_PplId = pld.PPL_PplId
+        INNER JOIN CDN.DefProjekty dp
+        ON pldg.PGL_PrjId = dp.PRJ_PrjId
+        WHERE pld.PPL_Data >= ?1
+        AND pld.PPL_Data <= ?2
+        AND pld.PPL_TypDnia = 1
+        ORDER BY lp.IdPracownika
+        """
+
+PAID_EMPLOYEES_SQL = f"""
+        SELECT  DISTINCT wyp.WPL_PraId
+        FROM CDN.Wyplaty AS wyp
+        INNER JOIN CDN.WypElementy AS ele
+        ON wyp.WPL_WplId = ele.WPE_WplId
+        WHERE wyp.WPL_DataOd >= ?
+        AND wyp.WPL_DataOd <= ?{_PAYROLL_FILTER}
+        """
+
+CURRENT_EMPLOYEES_SQL = """
+        SELECT  DISTINCT p.PRE_PraId
+            ,TRIM(p.PRE_Imie1) || ' ' || TRIM(p.PRE_Nazwisko)
+            ,p.PRE_Kod
+            ,p.PRE_ZatrudnionyDo
+        FROM CDN.PracEtaty AS p
+        WHERE p.PRE_DataDo >= '2999-12-31'
+        """
+
+PLANNED_PROJECTS_SQL = """
+        SELECT  DISTINCT pld.PPL_PraId
+            ,dp.PRJ_Kod
+        FROM CDN.PracPlanDni pld
+        INNER JOIN CDN.PracPlanDniGodz pldg
+        ON pldg.PGL_PplId = pld.PPL_PplId
+        INNER JOIN CDN.DefProjekty dp
+        ON pldg.PGL_PrjId = dp.PRJ_PrjId
+        WHERE pld.PPL_Data >= ?
+        AND pld.PPL_Data <= ?
+        AND pld.PPL_TypDnia = 1
+        """
+
+# The T-SQL query filters on undeclared @data_od/@data_do; without parameters
+# this one lists everybody with a counted payslip
+ACTIVE_EMPLOYEES_SQL = f"""
+        SELECT  DISTINCT p.PRE_PraId                                                         AS IdPracownika
+            ,p.PRE_Nazwisko || ' ' || p.PRE_Imie1                                            AS Pracownik
+        FROM CDN.PracEtaty AS p
+        INNER JOIN CDN.Wyplaty AS wyp
+        ON wyp.WPL_PraId = p.PRE_PraId
+        INNER JOIN CDN.WypElementy AS ele
+        ON wyp.WPL_WplId = ele.WPE_WplId
+        WHERE p.PRE_DataDo >= '2999-12-31'{_PAYROLL_FILTER}
+        ORDER BY p.PRE_PraId
+        """
+
+
+def employees_for_periods_sql(period_count: int) -> str:
+    """SQLite version of employee_repository.employees_for_periods_sql"""
+    values = ", ".join("(?, ?, ?)" for _ in range(period_count))
+    return f"""
+        WITH Okresy (Okres, DataOd, DataDo) AS
+        (
+            VALUES {values}
+        ),
+        ListaPracownikow AS
+        (
+            SELECT  DISTINCT o.Okres
+                ,o.DataOd
+                ,o.DataDo
+                ,p.PRE_PraId                                                                 AS IdPracownika
+                ,TRIM(p.PRE_Imie1) || ' ' || TRIM(p.PRE_Nazwisko)                           AS Pracownik
+                ,p.PRE_Kod                                                                   AS Kod
+                ,CASE WHEN wyp.WPL_NumerPelny NOT LIKE 'U%' THEN 'etat' ELSE 'zlecenie' END  AS TypZatrudnienia
+                ,wyp.WPL_NumerPelny
+                ,p.PRE_ZatrudnionyDo                                                         AS KoniecZatrudnienia
+            FROM Okresy AS o
+            INNER JOIN CDN.Wyplaty AS wyp
+            ON wyp.WPL_DataOd >= o.DataOd
+            AND wyp.WPL_DataOd <= o.DataDo
+            INNER JOIN CDN.PracEtaty AS p
+            ON wyp.WPL_PraId = p.PRE_PraId
+            INNER JOIN CDN.WypElementy AS ele
+            ON wyp.WPL_WplId = ele.WPE_WplId
+            WHERE p.PRE_DataDo >= '2999-12-31'{_PAYROLL_FILTER}
+        )
+        SELECT  DISTINCT lp.Okres
+            ,lp.IdPracownika
+            ,lp.Pracownik
+            ,lp.Kod
+            ,dp.PRJ_Kod
+            ,lp.KoniecZatrudnienia
+            ,CASE WHEN lp.KoniecZatrudnienia BETWEEN lp.DataOd AND lp.DataDo THEN 1 ELSE 0 END
+        FROM ListaPracownikow lp
+        INNER JOIN CDN.PracPlanDni pld
+        ON pld.PPL_PraId = lp.IdPracownika
+        INNER JOIN CDN.PracPlanDniGodz pldg
+        ON pldg.PGL_PplId = pld.PPL_PplId
+        INNER JOIN CDN.DefProjekty dp
+        ON pldg.PGL_PrjId = dp.PRJ_PrjId
+        WHERE pld.PPL_Data >= lp.DataOd
+        AND pld.PPL_Data <= lp.DataDo
+        AND pld.PPL_TypDnia = 1
+        ORDER BY lp.Okres, lp.IdPracownika
+        """
+
+
+class SqliteBackend(RepositoryBackend):
+    """The repository queries on a local SQLite copy of the CDN tables"""
+
+    name = "sqlite"
+    employees_with_project_codes_sql = EMPLOYEES_WITH_PROJECT_CODES_SQL
+    paid_employees_sql = PAID_EMPLOYEES_SQL
+    current_employees_sql = CURRENT_EMPLOYEES_SQL
+    planned_projects_sql = PLANNED_PROJECTS_SQL
+    active_employees_sql = ACTIVE_EMPLOYEES_SQL
+
+    def employees_for_periods_sql(self, period_count: int) -> str:
+        return employees_for_periods_sql(period_count)
+
+
+SQLITE_BACKEND = SqliteBackend()
+
+
+def _parse_datetime(value: bytes) -> datetime:
+    return datetime.fromisoformat(value.decode("utf-8"))
+
+
+def create_cdn_database(path: Path) -> Path:
+    """Create the SQLite file with the CDN tables (SCHEMA), if not there yet"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SCHEMA)
+    finally:
+        conn.close()
+    return path
+
+
+class SqliteDatabase:
+    """
+    Stand-in for DatabaseConnection on a SQLite file made by
+    create_cdn_database, for running the repositories and services offline.
+
+    The file is attached as "CDN", so the tables resolve by the same names as
+    on SQL Server, and repositories pick the SQLite queries from `backend`.
+    """
+
+    backend = SQLITE_BACKEND
+
+    def __init__(self, path: Path, fetch_arraysize: int = DEFAULT_FETCH_ARRAYSIZE):
+        # DATETIME columns come back as datetime, like the datetime columns of
+        # pyodbc. sqlite3 keeps converters in one process-wide table, so this
+        # is registered here rather than on import, and only connections
+        # opened with detect_types (as in `connect`) apply it.
+        sqlite3.register_converter("DATETIME", _parse_datetime)
+        self.path = Path(path)
+        self.fetch_arraysize = fetch_arraysize
+        self.conn: Optional[sqlite3.Connection] = None
+        # Statements executed, like DatabaseConnection.round_trips
+        self.round_trips = 0
+        # Seconds spent executing statements and fetching their rows
+        self.query_seconds = 0.0
+
+    @classmethod
+    def from_config(cls, config) -> "SqliteDatabase":
+        """
+        The file at [database] sqlite_path, resolved like the other configured
+        paths: a relative path is relative to the program's folder.
+        """
+        from utils.paths import resolve_dir
+
+        return cls(
+            resolve_dir(
+                config.get("database", "sqlite_path", fallback=None), "cdn.sqlite3"
+            ),
+            config.getint(
+                "database", "fetch_arraysize", fallback=DEFAULT_FETCH_ARRAYSIZE
+            ),
+        )
+
+    def connect(self) -> bool:
+        if not self.path.exists():
+            print(f"SQLite database not found: {self.path}")
+            return False
+        try:
+            # The connection may be opened on a startup thread and used on
+            # another one, never by two threads at once
+            self.conn = sqlite3.connect(
+                ":memory:",
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                check_same_thread=False,
+            )
+            self.conn.execute("ATTACH DATABASE ? AS CDN", (str(self.path),))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error opening the SQLite database: {str(e)}")
+            self.conn = None
+            return False
+
+    def _execute(self, query: str, params: Optional[Tuple] = None):
+        if self.conn is None and not self.connect():
+            raise Exception("Failed to connect to database")
+        self.round_trips += 1
+        return self.conn.execute(query, params or ())
+
+    def iter_query(
+        self, query: str, params: Optional[Tuple] = None, arraysize: int = 0
+    ) -> Iterator[Tuple]:
+        """Rows of a SELECT query, fetched `arraysize` at a time"""
+        started = time.perf_counter()
+        cursor = self._execute(query, params)
+        cursor.arraysize = arraysize or self.fetch_arraysize
+        while True:
+            rows = cursor.fetchmany()
+            self.query_seconds += time.perf_counter() - started
+            if not rows:
+                return
+            yield from rows
+            started = time.perf_counter()
+
+    def execute_query(self, query: str, params: Optional[Tuple] = None) -> List[Tuple]:
+        """Execute a SELECT query and return all results"""
+        return list(self.iter_query(query, params))
+
+    def execute_scalar(self, query: str, params: Optional[Tuple] = None) -> Any:
+        """Execute a query and return a single value"""
+        row = next(iter(self.iter_query(query, params)), None)
+        return row[0] if row else None
+
+    def is_connected(self) -> bool:
+        return self.conn is not None
+
+    def close(self) -> None:
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+            print(
+                f"Database round trips: {self.round_trips} "
+                f"({self.query_seconds * 1000:.1f} ms in SQLite)"
+            )
+
+    def __enter__(self):
+        if not self.connect():
+            raise Exception("Failed to connect to database")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
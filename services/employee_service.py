@@ -1,13 +1,25 @@
-from typing import List
+from typing import Dict, List, Tuple
 from repositories import EmployeeRepository
+from repositories.roster_cache import months_of_range
 from models import Employee, EmployeeFactory
 
 
 class EmployeeService:
     """Service layer for employee business logic"""
 
-    def __init__(self, db_connection):
+    def __init__(self, db_connection, roster_cache=None):
         self.repository = EmployeeRepository(db_connection)
+        # Optional RosterCache; ranges of whole months are then put together
+        # from cached months instead of querying the server
+        self.roster_cache = roster_cache
+
+    def _cached_rows(self, start_date: str, end_date: str):
+        """Roster rows from the cache, or None when it does not cover the range"""
+        if self.roster_cache is None or months_of_range(start_date, end_date) is None:
+            return None
+        return self.roster_cache.employees_with_project_codes(
+            self.repository, start_date, end_date
+        )
 
     def get_employees_by_period(self, start_date: str, end_date: str) -> List[Employee]:
         """
@@ -21,14 +33,60 @@ class EmployeeService:
             List of Employee objects
         """
         try:
-            db_results = self.repository.get_employees_with_project_codes(
-                start_date, end_date
-            )
+            db_results = self._cached_rows(start_date, end_date)
+            if db_results is None:
+                # Rows become Employee objects as they are fetched, without a
+                # full list of rows next to the list of employees
+                db_results = self.repository.iter_employees_with_project_codes(
+                    start_date, end_date
+                )
             return EmployeeFactory.create_multiple_from_db_results(db_results)
         except Exception as e:
             print(f"Error in employee service: {e}")
             return []
 
+    def get_employees_by_periods(
+        self, periods: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], List[Employee]]:
+        """
+        Get employees with project codes for many periods with a single query
+
+        Args:
+            periods: List of (start_date, end_date) in format 'YYYY-MM-DD'
+
+        Returns:
+            Dictionary mapping every (start_date, end_date) to its Employee objects
+        """
+        employees_by_period = {tuple(period): [] for period in periods}
+
+        # Periods of whole months are put together from the roster cache,
+        # where they share their months; the rest takes a single query
+        remaining = []
+        for period in employees_by_period:
+            if self.roster_cache is not None and months_of_range(*period):
+                employees_by_period[period] = self.get_employees_by_period(*period)
+            else:
+                remaining.append(period)
+        if not remaining:
+            return employees_by_period
+
+        # Published only once every row was read, so a query failing part way
+        # leaves its periods empty instead of with part of their employees
+        fetched = {period: [] for period in remaining}
+        try:
+            db_results = self.repository.iter_employees_with_project_codes_for_periods(
+                remaining
+            )
+            for row in db_results:
+                fetched[remaining[row[0]]].append(
+                    EmployeeFactory.create_from_db_result(row[1:])
+                )
+        except Exception as e:
+            print(f"Error in employee service: {e}")
+            return employees_by_period
+        employees_by_period.update(fetched)
+        return employees_by_period
+
     def get_all_active_employees(self) -> List[Employee]:
         """
         Get all currently active employees
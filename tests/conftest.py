@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Allow running the tests from the repository root without installing
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,132 @@
+import configparser
+import sys
+import types
+
+import pytest
+
+if sys.version_info < (3, 12):
+    pytest.skip("db.py needs Python 3.12", allow_module_level=True)
+
+import db
+
+
+class FakeDriver:
+    """pyodbc stand-in whose server can be taken down and brought back."""
+
+    class Error(Exception):
+        pass
+
+    def __init__(self):
+        self.down = False
+        self.connects = 0
+
+    def drivers(self):
+        return ["ODBC Driver 18 for SQL Server"]
+
+    def connect(self, conn_str):
+        self.connects += 1
+        if self.down:
+            raise self.Error("08001", "Server unreachable")
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def _check(self):
+        if self.driver.down:
+            raise self.driver.Error("08S01", "Communication link failure")
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def execute(self, query):
+        self._check()
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        self.conn._check()
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def driver(monkeypatch):
+    fake = FakeDriver()
+    module = types.ModuleType("pyodbc")
+    module.Error = FakeDriver.Error
+    module.drivers = fake.drivers
+    module.connect = fake.connect
+    monkeypatch.setitem(sys.modules, "pyodbc", module)
+    monkeypatch.setattr(db, "RECONNECT_DELAY_SECONDS", 0.0)
+    db.sql_server_driver.cache_clear()
+    yield fake
+    db.sql_server_driver.cache_clear()
+
+
+@pytest.fixture
+def config():
+    config = configparser.ConfigParser()
+    config["database"] = {
+        "host": "server",
+        "port": "1433",
+        "user": "user",
+        "password": "secret",
+        "database": "cdn",
+        "reconnect_attempts": "2",
+    }
+    return config
+
+
+def test_connection_recovers_after_reconnect_attempts_ran_out(driver, config):
+    connection = db.DatabaseConnection(config)
+    assert connection.connect()
+
+    driver.down = True
+    with pytest.raises(Exception, match="Database connection lost"):
+        connection.execute_scalar("SELECT 1")
+    assert connection.conn is None
+
+    driver.down = False
+    assert connection.execute_scalar("SELECT 1") == 1
+    assert connection.reconnects == 1
+
+
+def test_closed_connection_is_not_reopened(driver, config):
+    connection = db.DatabaseConnection(config)
+    assert connection.connect()
+    connection.close()
+
+    with pytest.raises(Exception, match="Call connect"):
+        connection.execute_scalar("SELECT 1")
+
+
+def test_pool_replaces_connection_lost_in_a_failed_reconnect(driver, config):
+    config["database"]["pool_size"] = "1"
+    pool = db.ConnectionPool(config)
+    assert pool.warm_up() == 1
+
+    with pytest.raises(Exception, match="Database connection lost"):
+        with pool.connection() as connection:
+            driver.down = True
+            connection.execute_scalar("SELECT 1")
+    assert pool._connections == []
+
+    driver.down = False
+    with pool.connection() as connection:
+        assert connection.execute_scalar("SELECT 1") == 1
+    assert pool._connections == [connection]
+    pool.close()
@@ -0,0 +1,43 @@
+import os
+import stat
+
+from docx import Document
+
+from utils.docx_writer import StreamingDocxWriter, atomic_save
+
+
+def default_file_mode():
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def empty_body_template(tmp_path):
+    doc = Document()
+    body = doc.element.body
+    for child in list(body):
+        if not child.tag.endswith("}sectPr"):
+            body.remove(child)
+    path = tmp_path / "template.docx"
+    doc.save(str(path))
+    return path.read_bytes()
+
+
+def test_atomic_save_uses_default_file_mode(tmp_path):
+    path = tmp_path / "report.docx"
+
+    atomic_save(Document(), path)
+
+    assert stat.S_IMODE(path.stat().st_mode) == default_file_mode()
+    assert [p.name for p in tmp_path.iterdir()] == ["report.docx"]
+
+
+def test_streaming_writer_uses_default_file_mode(tmp_path):
+    template = empty_body_template(tmp_path)
+    path = tmp_path / "report.docx"
+
+    with StreamingDocxWriter(template, path) as writer:
+        writer.write(b"<w:p><w:r><w:t>Raport</w:t></w:r></w:p>")
+
+    assert stat.S_IMODE(path.stat().st_mode) == default_file_mode()
+    assert "Raport" in "\n".join(p.text for p in Document(str(path)).paragraphs)
@@ -0,0 +1,22 @@
+from repositories import SqliteDatabase
+from services.employee_service import EmployeeService
+
+PERIODS = [("2024-10-01", "2024-10-31"), ("2024-11-01", "2024-11-30")]
+
+
+class FailingRepository:
+    """Streams the first rows of the batch query, then loses the connection."""
+
+    def iter_employees_with_project_codes_for_periods(self, periods):
+        yield (0, 1, "Jan Kowalski", "P00001", "MONO_ZI", None, 0)
+        yield (1, 2, "Anna Nowak", "P00002", "MONO_ZI", None, 0)
+        raise Exception("Communication link failure")
+
+
+def test_periods_stay_empty_when_the_batch_query_fails(tmp_path):
+    service = EmployeeService(SqliteDatabase(tmp_path / "cdn.sqlite3"))
+    service.repository = FailingRepository()
+
+    employees_by_period = service.get_employees_by_periods(PERIODS)
+
+    assert employees_by_period == {period: [] for period in PERIODS}
@@ -0,0 +1,99 @@
+from configparser import ConfigParser
+from datetime import time as day_time
+from http.server import ThreadingHTTPServer
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from benchmarks.synthetic import write_synthetic_cdn_database, write_synthetic_csvs
+from report_server import MonthEndScheduler, ReportService, _handler_class
+
+
+@pytest.fixture
+def server(tmp_path):
+    # Jobs are only queued, the service is not started
+    service = ReportService(None, (tmp_path / "bron.csv",))
+    scheduler = MonthEndScheduler(service, [], day_time(20, 0))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler_class(service, scheduler))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}", service
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(url, body: bytes):
+    request = urllib.request.Request(url + "/jobs", data=body, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"not json",
+        b"[1, 2]",
+        b'{"period": 202410}',
+        b'{"interval": ["kwartalny"]}',
+        b'{"interval": null}',
+        b'{"split": 1}',
+        b'{"stream": "false"}',
+        b'{"stream": 1}',
+        b'{"period": "2024-13"}',
+        b'{"interval": "tygodniowy"}',
+    ],
+)
+def test_malformed_job_requests_get_400(server, body):
+    url, service = server
+
+    status, response = post(url, body)
+
+    assert status == 400
+    assert response["error"]
+    assert service.queued() == 0
+
+
+def test_job_request_is_queued(server):
+    url, service = server
+
+    status, response = post(
+        url, b'{"interval": "kwartalny", "period": "2024-11", "stream": false}'
+    )
+
+    assert status == 202
+    assert response["start_date"] == "2024-10-01"
+    assert response["stream"] is False
+    assert service.queued() == 1
+
+
+def test_service_keeps_csvs_warm_and_reads_sqlite_backend(tmp_path):
+    config = ConfigParser()
+    config["database"] = {
+        "backend": "sqlite",
+        "sqlite_path": str(
+            write_synthetic_cdn_database(tmp_path / "cdn.sqlite3", 10, seed=0)
+        ),
+    }
+    service = ReportService(config, write_synthetic_csvs(tmp_path / "data", 10, 0))
+
+    service.warm_up()
+    warm = service._generator
+    assert warm is not None
+
+    start_date, end_date = "2024-10-01", "2024-10-31"
+    employees = service._employees(start_date, end_date)
+    assert employees
+    generator = service._generator_for(
+        "miesieczny", start_date, end_date, "10", None, employees
+    )
+    assert generator.employees == employees
+
+    with pytest.raises(Exception, match="Brak pracowników"):
+        service._generator_for("miesieczny", start_date, end_date, "10", None, [])
+    assert service._generator is warm
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+from benchmarks.synthetic import write_synthetic_cdn_database
+from repositories import EmployeeRepository, RosterCache, SqliteDatabase
+
+QUARTER = ("2024-10-01", "2024-12-31")
+
+
+def sort_rows(rows):
+    return sorted(
+        (tuple(row) for row in rows), key=lambda row: (row[0], str(row[3]), row[1])
+    )
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = write_synthetic_cdn_database(
+        tmp_path / "cdn.sqlite3", 10, employees_per_ck=(3, 6), seed=2
+    )
+    with SqliteDatabase(path) as db:
+        yield db
+
+
+def test_cached_quarter_matches_query(database, tmp_path):
+    repository = EmployeeRepository(database)
+    cache = RosterCache(tmp_path / "roster.sqlite3")
+
+    cached = cache.employees_with_project_codes(repository, *QUARTER)
+
+    assert cached
+    assert cached == sort_rows(repository.get_employees_with_project_codes(*QUARTER))
+
+
+def test_cached_quarter_uses_current_employee_records(database, tmp_path):
+    repository = EmployeeRepository(database)
+    cache = RosterCache(tmp_path / "roster.sqlite3")
+    # October is cached before the employee records change, November and
+    # December after
+    cache.employees_with_project_codes(repository, "2024-10-01", "2024-10-31")
+    employee_id = cache.employees_with_project_codes(
+        repository, "2024-10-01", "2024-10-31"
+    )[0][0]
+
+    conn = sqlite3.connect(database.path)
+    with conn:
+        conn.execute(
+            "UPDATE PracEtaty SET PRE_ZatrudnionyDo = '2024-11-15', "
+            "PRE_Nazwisko = 'Zmieniona' "
+            "WHERE PRE_PraId = ? AND PRE_DataDo = '2999-12-31'",
+            (employee_id,),
+        )
+    conn.close()
+
+    cached = cache.employees_with_project_codes(repository, *QUARTER)
+
+    assert cached == sort_rows(repository.get_employees_with_project_codes(*QUARTER))
+    changed = {row[1:] for row in cached if row[0] == employee_id}
+    assert changed
+    assert all(row[3].strftime("%Y-%m-%d") == "2024-11-15" for row in changed)
+    assert all(row[4] == 1 for row in changed)
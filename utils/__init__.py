@@ -1,10 +1,14 @@
 from .utils import (
     get_unique_file_path,
+    reserve_unique_file_path,
+    safe_file_name_part,
 )
 
 # Export main classes for easy importing
 __all__ = [
     "get_unique_file_path",
+    "reserve_unique_file_path",
+    "safe_file_name_part",
 ]
 
 __version__ = "1.0.0"
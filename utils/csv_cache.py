@@ -0,0 +1,102 @@
+from dataclasses import astuple, dataclass
+import hashlib
+import logging
+import os
+from pathlib import Path
+import pickle
+import tempfile
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Part of every entry, bump it whenever the cached frames change shape
+CSV_CACHE_VERSION = "1"
+
+
+@dataclass(frozen=True)
+class FileFingerprint:
+    """Identity of an input file's content at the time it was read."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+def file_fingerprint(file_path) -> FileFingerprint:
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return FileFingerprint(
+        str(path), stat.st_size, stat.st_mtime_ns, digest.hexdigest()
+    )
+
+
+class CsvCache:
+    """
+    Parsed, typed input CSVs stored as pandas pickles, one entry per file and
+    schema.
+
+    An entry is used only while the file still has the same path, size,
+    modification time and content hash, so editing a CSV invalidates it. It
+    also records the pandas version and the schema it was read with. Entries
+    are written through a temporary file and renamed into place, so two runs
+    starting at the same time at worst both parse the file; neither can read
+    a half-written entry. Unreadable entries count as misses.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def _entry_path(self, fingerprint: FileFingerprint, schema) -> Path:
+        name = hashlib.sha256(f"{fingerprint.path}|{schema}".encode()).hexdigest()
+        return self.directory / f"{name[:32]}.pkl"
+
+    def _key(self, fingerprint: FileFingerprint, schema) -> tuple:
+        import pandas as pd
+
+        return (CSV_CACHE_VERSION, pd.__version__, repr(schema), astuple(fingerprint))
+
+    def get(self, fingerprint: FileFingerprint, schema):
+        """The cached (frame, extra) of the file, or None when it is stale."""
+        path = self._entry_path(fingerprint, schema)
+        try:
+            with open(path, "rb") as f:
+                key, frame, extra = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable CSV cache entry {path}: {e}")
+            return None
+
+        if key != self._key(fingerprint, schema):
+            return None
+        logger.info(f"Loaded {Path(fingerprint.path).name} from the CSV cache")
+        return frame, extra
+
+    def put(self, fingerprint: FileFingerprint, schema, frame: "pd.DataFrame", extra):
+        """Store the parsed frame of the file, with `extra` data kept along."""
+        path = self._entry_path(fingerprint, schema)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(
+                        (self._key(fingerprint, schema), frame, extra),
+                        f,
+                        protocol=pickle.HIGHEST_PROTOCOL,
+                    )
+                os.replace(temp_name, path)
+            except BaseException:
+                Path(temp_name).unlink(missing_ok=True)
+                raise
+        except OSError as e:
+            # A cache that can't be written must not break the report
+            logger.warning(f"Could not write CSV cache entry {path}: {e}")
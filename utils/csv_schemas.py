@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class CsvSchema:
+    """
+    Columns of an input CSV that the generator uses and how to store them.
+
+    Only `columns` are read; columns missing from a file are skipped, the
+    same way as with a full read. `categories` hold repeated codes and are
+    stored as categoricals. `dates` are parsed by the generator right after
+    loading, so invalid values can be reported. Numbers keep pandas' own
+    inference, which matches how they were always rendered.
+    """
+
+    columns: tuple[str, ...]
+    categories: tuple[str, ...] = ()
+    dates: tuple[str, ...] = ()
+
+
+ENTITIES_SCHEMA = CsvSchema(
+    columns=(
+        "POZ KS R Umów",
+        "Oznaczenie strony lub stron umowy, z którymi przedsiębiorca zawarł umowę",
+        "Dział",
+        "CK",
+        "Określenie obiektu",
+        "Adres Obiektu",
+        "Forma wykonywanej usługi",
+        "Data rozpoczęcia usługi",
+        "Data zakończenia usługi",
+        "Uwagi",
+        "Świadczenie/ zlecanie podjazdów/ podjazdy",
+    ),
+    categories=(
+        "Dział",
+        "CK",
+        "Forma wykonywanej usługi",
+        "Świadczenie/ zlecanie podjazdów/ podjazdy",
+    ),
+    dates=("Data rozpoczęcia usługi", "Data zakończenia usługi"),
+)
+
+FIREARMS_SCHEMA = CsvSchema(
+    columns=(
+        "Rodzaj broni palnej",
+        "Marka broni",
+        "Kaliber",
+        "Ilość",
+        "Obiekt, do którego przydzielono pracownikom broń palną",
+        "Daty dotyczące przydziału broni palnej",
+        "Uwagi",
+    ),
+    categories=("Obiekt, do którego przydzielono pracownikom broń palną",),
+    dates=("Daty dotyczące przydziału broni palnej",),
+)
+
+SUPERVISION_SCHEMA = CsvSchema(
+    columns=(
+        "Dział",
+        "Nazwisko",
+        "Imię",
+        "Nr legitymacji",
+        "Funkcja w obiekcie",
+        "rozpoczęcie",
+        "zakończenie",
+        "Uwagi",
+    ),
+    categories=("Dział", "Funkcja w obiekcie"),
+    dates=("rozpoczęcie", "zakończenie"),
+)
+
+
+def read_csv_with_schema(file_path, schema: CsvSchema) -> pd.DataFrame:
+    """Read only the schema's columns of a UTF-8 CSV, with categorical codes."""
+    wanted = set(schema.columns)
+    return pd.read_csv(
+        file_path,
+        encoding="utf-8",
+        usecols=lambda column: column in wanted,
+        dtype={column: "category" for column in schema.categories},
+    )
@@ -0,0 +1,91 @@
+from typing import Sequence
+from xml.sax.saxutils import escape
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Inches
+
+# Width of the text area the column percentages refer to (A4/Letter with 0.5" margins)
+TEXT_WIDTH_INCHES = 7.5
+
+
+def column_widths_twips(col_widths: Sequence[float]) -> list[int]:
+    """Convert column widths given in percent of the text width to twips."""
+    return [Inches(width / 100 * TEXT_WIDTH_INCHES).twips for width in col_widths]
+
+
+def add_table(
+    doc,
+    headers: Sequence[str],
+    col_widths: Sequence[float],
+    rows: Sequence[Sequence[str]],
+    style_id: str = "TableGrid",
+):
+    """
+    Append a table with a bold header row and `rows` below it to the end of `doc`.
+
+    The whole `w:tbl` element (style, `tblGrid` widths, cell widths and text) is
+    built as one XML string and parsed in a single lxml pass, instead of going
+    through python-docx cell accessors that rebuild the cell grid on every call.
+    `col_widths` are percentages of the text width, every row must have one
+    string per column.
+    """
+    widths = column_widths_twips(col_widths)
+
+    parts = [
+        f'<w:tbl {nsdecls("w")}><w:tblPr><w:tblStyle w:val="{style_id}"/>'
+        '<w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0"'
+        ' w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr><w:tblGrid>'
+    ]
+    parts.extend(f'<w:gridCol w:w="{width}"/>' for width in widths)
+    parts.append("</w:tblGrid>")
+
+    parts.append(_row_xml(headers, widths, bold=True))
+    for row in rows:
+        parts.append(_row_xml(row, widths, bold=False))
+    parts.append("</w:tbl>")
+
+    tbl = parse_xml("".join(parts))
+    doc.element.body._insert_tbl(tbl)  # pyright: ignore[reportPrivateUsage]
+    return tbl
+
+
+def _row_xml(values: Sequence[str], widths: Sequence[int], bold: bool) -> str:
+    rpr = "<w:rPr><w:b/></w:rPr>" if bold else ""
+    cells = "".join(
+        f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>'
+        f"<w:p><w:r>{rpr}{_run_content_xml(value)}</w:r></w:p></w:tc>"
+        for value, width in zip(values, widths)
+    )
+    return f"<w:tr>{cells}</w:tr>"
+
+
+def _run_content_xml(text: str) -> str:
+    """
+    Run content for `text`, matching python-docx's `Run.text` setter: tabs
+    become `w:tab`, line breaks become `w:br` and everything else goes into
+    `w:t` elements.
+    """
+    if "\t" not in text and "\n" not in text and "\r" not in text:
+        return _t_xml(text)
+
+    parts = []
+    buffer = []
+    for char in text:
+        if char == "\t" or char in "\r\n":
+            parts.append(_t_xml("".join(buffer)))
+            parts.append("<w:tab/>" if char == "\t" else "<w:br/>")
+            buffer.clear()
+        else:
+            buffer.append(char)
+    parts.append(_t_xml("".join(buffer)))
+    return "".join(parts)
+
+
+def _t_xml(text: str) -> str:
+    if not text:
+        return ""
+    if len(text.strip()) < len(text):
+        return f'<w:t xml:space="preserve">{escape(text)}</w:t>'
+    return f"<w:t>{escape(text)}</w:t>"
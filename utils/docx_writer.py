@@ -0,0 +1,128 @@
+from io import BytesIO
+import os
+from pathlib import Path
+import tempfile
+import zipfile
+
+# Part python-docx saves the main document to
+DOCUMENT_PART = "word/document.xml"
+
+# The process umask, read once: os.umask can only be read by setting it, which
+# is not safe to do while other threads create files
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def _temp_path_next_to(path: Path) -> Path:
+    fd, temp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp"
+    )
+    os.close(fd)
+    # mkstemp creates the file owner-only (0600) and os.replace keeps the mode;
+    # give reports the mode a plain open() would, like doc.save did
+    os.chmod(temp_name, 0o666 & ~_UMASK)
+    return Path(temp_name)
+
+
+def atomic_save(doc, path: Path):
+    """
+    Save a python-docx document to `path` through a temporary file in the same
+    folder, so readers never see a half-written report.
+    """
+    temp_path = _temp_path_next_to(path)
+    try:
+        doc.save(str(temp_path))
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+class StreamingDocxWriter:
+    """
+    Writes a .docx whose body is streamed straight into the `word/document.xml`
+    zip entry.
+
+    `template` is a serialized document with an empty body (only `w:sectPr`);
+    all of its other parts are copied as they are. Body fragments passed to
+    `write` must be serialized top-level body elements (`w:p`, `w:tbl`). The
+    file is written to a temporary file and renamed to `path` on success, so
+    at no point is more than one fragment held in memory and a failed run
+    leaves nothing behind.
+
+    Usage:
+        with StreamingDocxWriter(template, path) as writer:
+            writer.write(fragment)
+    """
+
+    def __init__(self, template: bytes, path: Path):
+        self.template = template
+        self.path = Path(path)
+        self._temp_path: Path | None = None
+        self._zip: zipfile.ZipFile | None = None
+        self._stream = None
+        self._tail = b""
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def open(self):
+        with zipfile.ZipFile(BytesIO(self.template)) as template_zip:
+            document_xml = template_zip.read(DOCUMENT_PART)
+            body_start = document_xml.find(b"<w:body>")
+            split_at = document_xml.find(b"<w:sectPr")
+            if body_start == -1 or split_at == -1:
+                raise ValueError("Template document has no body section properties")
+            if document_xml[body_start + len(b"<w:body>") : split_at].strip():
+                raise ValueError("Template document body is not empty")
+            head, self._tail = document_xml[:split_at], document_xml[split_at:]
+
+            self._temp_path = _temp_path_next_to(self.path)
+            self._zip = zipfile.ZipFile(
+                self._temp_path, "w", compression=zipfile.ZIP_DEFLATED
+            )
+            # Only one entry can be open for writing, so copy the fixed parts first
+            for info in template_zip.infolist():
+                if info.filename != DOCUMENT_PART:
+                    self._zip.writestr(
+                        info, template_zip.read(info.filename), zipfile.ZIP_DEFLATED
+                    )
+
+        document_info = zipfile.ZipInfo(DOCUMENT_PART)
+        document_info.compress_type = zipfile.ZIP_DEFLATED
+        self._stream = self._zip.open(document_info, "w")
+        self._stream.write(head)
+
+    def write(self, fragment: bytes):
+        if self._stream is None:
+            raise Exception("Writer is not open. Call open() first.")
+        self._stream.write(fragment)
+
+    def close(self):
+        """Finish the document and move it to its final path."""
+        if self._stream is None or self._zip is None or self._temp_path is None:
+            return
+        self._stream.write(self._tail)
+        self._stream.close()
+        self._zip.close()
+        os.replace(self._temp_path, self.path)
+        self._stream = self._zip = self._temp_path = None
+
+    def abort(self):
+        """Drop the partially written file."""
+        try:
+            if self._stream is not None:
+                self._stream.close()
+            if self._zip is not None:
+                self._zip.close()
+        finally:
+            if self._temp_path is not None:
+                self._temp_path.unlink(missing_ok=True)
+            self._stream = self._zip = self._temp_path = None
@@ -0,0 +1,96 @@
+import logging
+import os
+from pathlib import Path
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Default size limit of the cache directory
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+ENTRY_SUFFIX = ".bin"
+
+
+class FragmentCache:
+    """
+    On-disk cache of rendered fragments, one file per key.
+
+    Entries are written through a temporary file and renamed into place, so
+    concurrent runs (or worker processes) never read a half-written entry.
+    Reading an entry refreshes its modification time; `trim` removes the
+    least recently used entries until the directory fits in `max_bytes`.
+    The object only holds the directory and the limit, so it can be sent to
+    worker processes.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}{ENTRY_SUFFIX}"
+
+    def contains(self, key: str) -> bool:
+        return self._entry_path(key).exists()
+
+    def get(self, key: str) -> bytes | None:
+        path = self._entry_path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_name, self._entry_path(key))
+            except BaseException:
+                Path(temp_name).unlink(missing_ok=True)
+                raise
+        except OSError as e:
+            # A cache that can't be written must not break the report
+            logger.warning(f"Could not write fragment cache entry {key}: {e}")
+
+    def trim(self):
+        """Evict the least recently used entries above the size limit."""
+        try:
+            entries = [
+                entry
+                for entry in os.scandir(self.directory)
+                if entry.name.endswith(ENTRY_SUFFIX)
+            ]
+        except FileNotFoundError:
+            return
+
+        stats = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            stats.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in stats)
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for _, size, path in sorted(stats):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        logger.info(f"Fragment cache: evicted {evicted} entries from {self.directory}")
@@ -0,0 +1,119 @@
+import sys
+import threading
+import time
+
+
+class _TimedLoader:
+    """Wraps a module's loader for one import and times creating/executing it."""
+
+    def __init__(self, loader, timer: "ImportTimer", name: str):
+        self.loader = loader
+        self.timer = timer
+        self.name = name
+
+    def create_module(self, spec):
+        create_module = getattr(self.loader, "create_module", None)
+        if create_module is None:
+            return None
+        return self.timer.timed(self.name, lambda: create_module(spec))
+
+    def exec_module(self, module):
+        # Put the real loader back first, the module keeps no trace of the timer
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self.timer.timed(self.name, lambda: self.loader.exec_module(module))
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class _TimingFinder:
+    """Meta path finder that asks the other finders and wraps the loader found."""
+
+    def __init__(self, timer: "ImportTimer"):
+        self.timer = timer
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, "find_spec", None)
+            if finder is self or find_spec is None:
+                continue
+            spec = find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self.timer, name)
+        return spec
+
+
+class ImportTimer:
+    """
+    Measures how long every module imported after `install` took to load.
+
+    The cumulative time of a module includes the modules it imported in turn,
+    the self time doesn't. This works the same way in the frozen executable,
+    where `python -X importtime` is not available. Imports running on several
+    threads at once are nested per thread, so one thread's imports are never
+    charged to a module another thread is importing.
+    """
+
+    def __init__(self):
+        self.cumulative: dict[str, float] = {}
+        self.self_time: dict[str, float] = {}
+        self.total = 0.0
+        # Per thread, the time spent in nested imports of every module being
+        # imported, innermost last
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._finder = _TimingFinder(self)
+
+    def install(self) -> "ImportTimer":
+        if self._finder not in sys.meta_path:
+            sys.meta_path.insert(0, self._finder)
+        return self
+
+    def uninstall(self):
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    def timed(self, name: str, call):
+        stack = getattr(self._local, "children", None)
+        if stack is None:
+            stack = self._local.children = []
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            elapsed = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                if not stack:
+                    self.total += elapsed
+                self.cumulative[name] = self.cumulative.get(name, 0.0) + elapsed
+                self.self_time[name] = (
+                    self.self_time.get(name, 0.0) + elapsed - children
+                )
+
+    def report(self, limit: int = 30) -> str:
+        """The modules with the highest cumulative import time."""
+        lines = [
+            f"{'Module':<48} {'cumulative ms':>14} {'self ms':>9}",
+            "-" * 73,
+        ]
+        ranked = sorted(self.cumulative.items(), key=lambda item: -item[1])
+        for name, seconds in ranked[:limit]:
+            lines.append(
+                f"{name:<48} {seconds * 1000:>14.1f} "
+                f"{self.self_time[name] * 1000:>9.1f}"
+            )
+        lines.append(
+            f"{len(self.cumulative)} modules imported in {self.total * 1000:.1f} ms"
+        )
+        return "\n".join(lines)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+
+def active_in_periods(starts, ends, period_starts, period_ends) -> np.ndarray:
+    """
+    Return a (periods x intervals) boolean matrix telling which intervals were
+    active in which period.
+
+    An interval is active in a period when it started on or before the end of
+    the period and either has no end date or ended on or after the start of
+    the period. Intervals without a start date are never active.
+    """
+    starts = np.asarray(starts, dtype="datetime64[ns]")
+    ends = np.asarray(ends, dtype="datetime64[ns]")
+    period_starts = np.atleast_1d(np.asarray(period_starts, dtype="datetime64[ns]"))
+    period_ends = np.atleast_1d(np.asarray(period_ends, dtype="datetime64[ns]"))
+
+    # Comparisons with NaT are always False, so a missing start never matches
+    started = starts[np.newaxis, :] <= period_ends[:, np.newaxis]
+    not_ended = np.isnat(ends)[np.newaxis, :] | (
+        ends[np.newaxis, :] >= period_starts[:, np.newaxis]
+    )
+    return started & not_ended
+
+
+def active_in_period(starts, ends, period_start, period_end) -> np.ndarray:
+    """Boolean mask of the intervals active in a single period."""
+    return active_in_periods(starts, ends, [period_start], [period_end])[0]
+
+
+class GroupedIntervalIndex:
+    """
+    Rows of a DataFrame grouped by a key column, with their start and end
+    dates kept as datetime64 arrays for vectorized period lookups.
+    """
+
+    def __init__(
+        self, df: pd.DataFrame, group_column: str, start_column: str, end_column: str
+    ):
+        self._groups = {}
+        if df.empty or group_column not in df.columns:
+            return
+
+        for key, rows in df.groupby(group_column, sort=False, observed=True):
+            rows = rows.reset_index(drop=True)
+            self._groups[key] = (
+                rows,
+                rows[start_column].to_numpy(dtype="datetime64[ns]"),
+                rows[end_column].to_numpy(dtype="datetime64[ns]"),
+            )
+
+    def keys(self):
+        return self._groups.keys()
+
+    def rows(self, key) -> pd.DataFrame | None:
+        group = self._groups.get(key)
+        return group[0] if group is not None else None
+
+    def active_mask(self, key, period_starts, period_ends) -> np.ndarray:
+        """
+        Answer "who was active during period P" for many periods at once.
+        Returns a (periods x rows) boolean matrix for the given group.
+        """
+        group = self._groups.get(key)
+        if group is None:
+            return np.zeros((len(np.atleast_1d(period_starts)), 0), dtype=bool)
+        _, starts, ends = group
+        return active_in_periods(starts, ends, period_starts, period_ends)
+
+    def active_rows(self, key, period_start, period_end) -> pd.DataFrame | None:
+        """Rows of the group active in a single period, in their original order."""
+        group = self._groups.get(key)
+        if group is None:
+            return None
+        rows, starts, ends = group
+        return rows[active_in_period(starts, ends, period_start, period_end)]
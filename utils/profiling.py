@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+import heapq
+import time
+
+
+class SectionProfiler:
+    """
+    Accumulates wall time per phase (load, filter, render, ...) and per
+    contract section, and keeps the slowest contracts for the summary.
+
+    Timers only call `time.perf_counter`, so profiling adds little to a run.
+    Code that takes an optional profiler does nothing when it is None.
+    """
+
+    def __init__(self, slowest: int = 10):
+        self.totals: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.slowest = slowest
+        self._contracts = []
+        # Insertion counter breaking ties in the heap; a plain int keeps the
+        # profiler picklable, so pool workers can send theirs back
+        self._order = 0
+
+    def add(self, name: str, seconds: float, count: int = 1):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def timed(self, name: str, iterable):
+        """Yield from `iterable`, adding the time spent producing items to `name`."""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - started, count=0)
+                return
+            self.add(name, time.perf_counter() - started)
+            yield item
+
+    def add_contract(self, label: str, section_times: dict[str, float], rows: dict):
+        """Record the section times of one rendered contract."""
+        for section, seconds in section_times.items():
+            self.add(f"section {section}", seconds)
+        self._push_contract(sum(section_times.values()), label, rows)
+
+    def _push_contract(self, seconds: float, label: str, rows: dict):
+        self._order += 1
+        entry = (seconds, self._order, label, rows)
+        if len(self._contracts) < self.slowest:
+            heapq.heappush(self._contracts, entry)
+        else:
+            heapq.heappushpop(self._contracts, entry)
+
+    def merge(self, other: "SectionProfiler"):
+        """Add the timers and slowest contracts of `other`, e.g. from a worker."""
+        for name, seconds in other.totals.items():
+            self.add(name, seconds, other.counts[name])
+        for seconds, _, label, rows in sorted(other._contracts, key=lambda e: e[1]):
+            self._push_contract(seconds, label, rows)
+
+    def report(self) -> str:
+        """Summary table of all timers followed by the slowest contracts."""
+        total = sum(
+            seconds
+            for name, seconds in self.totals.items()
+            if not name.startswith("section ")
+        )
+        lines = [
+            f"{'Phase / section':<22} {'total s':>9} {'calls':>7} {'avg ms':>9} {'share':>6}",
+            "-" * 57,
+        ]
+        # Sections are listed, indented, under the render phase they are part of
+        sections = [name for name in self.totals if name.startswith("section ")]
+        names = []
+        for name in self.totals:
+            if name in sections:
+                continue
+            names.append(name)
+            if name == "render":
+                names.extend(sections)
+        if "render" not in names:
+            names.extend(sections)
+
+        for name in names:
+            seconds = self.totals[name]
+            count = self.counts[name]
+            average = seconds / count * 1000 if count else 0.0
+            share = f"{seconds / total:>6.1%}" if total else ""
+            label = f"  {name}" if name in sections else name
+            lines.append(
+                f"{label:<22} {seconds:>9.3f} {count:>7} {average:>9.2f} {share}"
+            )
+
+        if self._contracts:
+            lines.append("")
+            lines.append(f"Slowest {len(self._contracts)} contracts:")
+            ranked = sorted(self._contracts, key=lambda entry: -entry[0])
+            for rank, (seconds, _, label, rows) in enumerate(ranked, start=1):
+                counts = ", ".join(f"{name} {value}" for name, value in rows.items())
+                lines.append(
+                    f"{rank:>3}. {label:<28} {seconds * 1000:>9.2f} ms  ({counts})"
+                )
+        return "\n".join(lines)
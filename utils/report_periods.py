@@ -0,0 +1,72 @@
+import calendar
+from datetime import date, datetime
+
+
+def get_current_dates(interval: str):
+    today = date.today()
+    year = today.year
+    month = today.month
+
+    if interval == "miesieczny":
+        start = date(year, month, 1)
+        end = date(year, month, calendar.monthrange(year, month)[1])
+    elif interval == "kwartalny":
+        q_start_month = 3 * ((month - 1) // 3) + 1
+        q_end_month = q_start_month + 2
+        start = date(year, q_start_month, 1)
+        end = date(year, q_end_month, calendar.monthrange(year, q_end_month)[1])
+    else:
+        raise ValueError("Unknown interval")
+
+    return start, end
+
+
+def batch_periods(date_from: str, date_to: str, interval: str):
+    """
+    Periods between two months (YYYY-MM, both inclusive) as
+    (start_date, end_date, month, quarter) tuples for the batch mode.
+    """
+    first = datetime.strptime(date_from, "%Y-%m").date()
+    last = datetime.strptime(date_to, "%Y-%m").date()
+    if first > last:
+        raise ValueError("--from must not be after --to")
+
+    if interval == "miesieczny":
+        step = 1
+    elif interval == "kwartalny":
+        step = 3
+        first = date(first.year, 3 * ((first.month - 1) // 3) + 1, 1)
+    else:
+        raise ValueError("Unknown interval")
+
+    periods = []
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        end_year, end_month = year, month + step - 1
+        start = date(year, month, 1)
+        end = date(end_year, end_month, calendar.monthrange(end_year, end_month)[1])
+        if interval == "miesieczny":
+            period_month, period_quarter = calendar.month_name[month], None
+        else:
+            period_month, period_quarter = None, f"Kw.{(month - 1) // 3 + 1}"
+        periods.append(
+            (
+                start.strftime("%Y-%m-%d"),
+                end.strftime("%Y-%m-%d"),
+                period_month,
+                period_quarter,
+            )
+        )
+        month += step
+        if month > 12:
+            year, month = year + 1, month - 12
+
+    return periods
+
+
+def month_period(month: str, interval: str):
+    """
+    The (start_date, end_date, month, quarter) period of the given interval
+    containing a month (YYYY-MM).
+    """
+    return batch_periods(month, month, interval)[0]
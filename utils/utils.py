@@ -1,4 +1,6 @@
+import os
 from pathlib import Path
+import re
 
 
 def get_unique_file_path(base_path: Path) -> Path:
@@ -15,3 +17,31 @@ def get_unique_file_path(base_path: Path) -> Path:
         counter += 1
 
     return unique_path
+
+
+def reserve_unique_file_path(base_path: Path) -> Path:
+    """
+    Like `get_unique_file_path`, but creates the (empty) file while picking the
+    name, so two writers running at the same time can never get the same path.
+    The caller is expected to overwrite the file, or remove it on failure.
+    """
+    counter = 1
+    unique_path = base_path
+
+    while True:
+        try:
+            fd = os.open(unique_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            unique_path = base_path.with_name(
+                f"{base_path.stem}_{counter}{base_path.suffix}"
+            )
+            counter += 1
+            continue
+        os.close(fd)
+        return unique_path
+
+
+def safe_file_name_part(value) -> str:
+    """Turn a value into something usable inside a file name on Windows and Linux."""
+    text = re.sub(r'[<>:"/\\|?*\s]+', "_", str(value)).strip("._")
+    return text or "brak"